@@ -21,3 +21,9 @@ EXPORT_DIR.mkdir(parents=True, exist_ok=True)
 # Настройки прокси (опционально)
 PROXY_URL = os.getenv("PROXY_URL")  # Например: http://proxy.example.com:8080 или socks5://proxy.example.com:1080
 
+# Настройки webhook (опционально; без WEBHOOK_URL бот работает через long polling)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # Публичный HTTPS-адрес, например: https://bot.example.com
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")  # Секрет для пути и заголовка X-Telegram-Bot-Api-Secret-Token
+
@@ -1,48 +1,117 @@
 """Работа с SQLite базой данных."""
+import json
+import logging
 import sqlite3
-from datetime import datetime
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Optional, Tuple
-from app.config import DB_PATH
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+from app.db_pool import Row, borrow
 
+logger = logging.getLogger(__name__)
 
-def get_connection():
-    """Создает и возвращает соединение с базой данных."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Текущая версия схемы базы данных (PRAGMA user_version)
+SCHEMA_VERSION = 4
+
+# Перевод notify_at из текста YYYY-MM-DD HH:MM:SS (UTC) в секунды Unix epoch
+NOTIFY_AT_TO_EPOCH_SQL = (
+    "CASE WHEN typeof(notify_at) = 'text' "
+    "THEN CAST(strftime('%s', notify_at) AS INTEGER) ELSE notify_at END"
+)
+
+# Индексы таблицы shows: выборка спектаклей пользователя и поиск неотправленных напоминаний
+SHOW_INDEXES = {
+    'idx_shows_user': "CREATE INDEX IF NOT EXISTS idx_shows_user ON shows(user_id, datetime, created_at DESC)",
+    'idx_shows_pending': (
+        "CREATE INDEX IF NOT EXISTS idx_shows_pending ON shows(notified, notify_at) "
+        "WHERE notify_at IS NOT NULL"
+    ),
+}
+
+# Индексы, удаляемые на время bulk_load (idx_shows_pending нужен get_pending_notifications всегда)
+BULK_LOAD_INDEXES = ('idx_shows_user',)
+
+# Кэш спектаклей пользователей (LRU): user_id -> список спектаклей
+USER_SHOWS_CACHE_SIZE = 1024
+_user_shows_cache: "OrderedDict[int, List[Row]]" = OrderedDict()
+# Счетчик инвалидаций: результат запроса не кэшируется, если данные изменились во время чтения
+_user_shows_generation = 0
+_cache_lock = threading.Lock()
+
+# Кэш статистики театров (общая для всех пользователей, точность до минуты не нужна)
+THEATRES_STATS_TTL = 60
+_theatres_stats_cache: Optional[Tuple[float, List[Row]]] = None
+
+
+def _invalidate_user_shows(*user_ids: int) -> None:
+    """Сбрасывает кэш спектаклей указанных пользователей."""
+    global _user_shows_generation
+    with _cache_lock:
+        _user_shows_generation += 1
+        for user_id in user_ids:
+            _user_shows_cache.pop(user_id, None)
 
 
 def init_db():
-    """Инициализирует базу данных, создает таблицы если их нет."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Таблица пользователей
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            user_id INTEGER PRIMARY KEY,
-            username TEXT,
-            first_name TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Таблица спектаклей
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS shows (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            city TEXT NOT NULL,
-            theatre TEXT NOT NULL,
-            show_name TEXT NOT NULL,
-            show_date TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(user_id)
-        )
-    """)
-    
-    # Добавляем новые поля, если их нет (миграция)
+    """Инициализирует базу данных, создает таблицы если их нет и применяет недостающие миграции."""
+    with borrow() as conn:
+        cursor = conn.cursor()
+        
+        # Таблица пользователей
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                user_id INTEGER PRIMARY KEY,
+                username TEXT,
+                first_name TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # Таблица спектаклей
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS shows (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                city TEXT NOT NULL,
+                theatre TEXT NOT NULL,
+                show_name TEXT NOT NULL,
+                show_date TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users(user_id)
+            )
+        """)
+        
+        # Версия схемы хранится в PRAGMA user_version: на актуальной базе миграции не выполняются
+        cursor.execute("PRAGMA user_version")
+        version = cursor.fetchone()[0]
+        
+        if version < 1:
+            _migrate_add_columns(cursor)
+            cursor.execute("PRAGMA user_version = 1")
+        
+        if version < 2:
+            _migrate_drop_city(cursor)
+            cursor.execute("PRAGMA user_version = 2")
+        
+        if version < 3:
+            _migrate_fill_datetime(cursor)
+            cursor.execute("PRAGMA user_version = 3")
+        
+        if version < 4:
+            _migrate_notify_at_epoch(cursor)
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        
+        # Индексы создаются после пересоздания таблицы
+        for index_sql in SHOW_INDEXES.values():
+            cursor.execute(index_sql)
+        
+        conn.commit()
+
+
+def _migrate_add_columns(cursor: sqlite3.Cursor) -> None:
+    """Миграция 1: добавляет новые поля в таблицу shows, если их нет."""
     try:
         cursor.execute("ALTER TABLE shows ADD COLUMN source TEXT DEFAULT 'manual'")
     except sqlite3.OperationalError:
@@ -75,21 +144,66 @@ def init_db():
     except sqlite3.OperationalError as e:
         # Колонка уже существует
         pass
-    
-    # Удаляем колонку city, если она существует (миграция)
+
+
+def _migrate_drop_city(cursor: sqlite3.Cursor) -> None:
+    """Миграция 2: удаляет колонку city из таблицы shows."""
+    # SQLite 3.35+ удаляет колонку без перезаписи всей таблицы
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        try:
+            cursor.execute("ALTER TABLE shows DROP COLUMN city")
+        except sqlite3.OperationalError:
+            pass  # Колонки city уже нет
+        return
+    
+    _rebuild_shows_table(cursor)
+
+
+def _migrate_fill_datetime(cursor: sqlite3.Cursor) -> None:
+    """
+    Миграция 3: заполняет пустой datetime значением show_date
+    и пересоздает idx_shows_user, чтобы сортировка get_user_shows шла по индексу.
+    """
+    cursor.execute("UPDATE shows SET datetime = show_date WHERE datetime IS NULL")
+    cursor.execute("DROP INDEX IF EXISTS idx_shows_user")
+
+
+def _migrate_notify_at_epoch(cursor: sqlite3.Cursor) -> None:
+    """
+    Миграция 4: хранит notify_at как INTEGER (секунды Unix epoch, UTC) вместо текста,
+    чтобы idx_shows_pending сравнивал целые числа, а не строки.
+    """
+    # Колонку с индексом удалить нельзя; idx_shows_pending пересоздается в init_db
+    cursor.execute("DROP INDEX IF EXISTS idx_shows_pending")
+    
+    # SQLite 3.35+ меняет колонку без перезаписи всей таблицы
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        cursor.execute("ALTER TABLE shows ADD COLUMN notify_at_epoch INTEGER")
+        cursor.execute(f"UPDATE shows SET notify_at_epoch = {NOTIFY_AT_TO_EPOCH_SQL}")
+        cursor.execute("ALTER TABLE shows DROP COLUMN notify_at")
+        cursor.execute("ALTER TABLE shows RENAME COLUMN notify_at_epoch TO notify_at")
+        return
+    
+    _rebuild_shows_table(cursor)
+
+
+def _rebuild_shows_table(cursor: sqlite3.Cursor) -> None:
+    """
+    Пересоздает таблицу shows в актуальной схеме (для SQLite старше 3.35):
+    без колонки city и с notify_at в секундах Unix epoch.
+    """
     try:
-        # SQLite не поддерживает DROP COLUMN напрямую, используем пересоздание таблицы
         cursor.execute("PRAGMA foreign_keys = OFF")
         cursor.execute("""
             CREATE TEMPORARY TABLE shows_backup(
-                id, user_id, theatre, show_name, show_date, created_at, 
+                id, user_id, theatre, show_name, show_date, created_at,
                 source, external_id, url, datetime, notify_at, notified
             )
         """)
-        cursor.execute("""
-            INSERT INTO shows_backup 
+        cursor.execute(f"""
+            INSERT INTO shows_backup
             SELECT id, user_id, theatre, show_name, show_date, created_at,
-                   COALESCE(source, 'manual'), external_id, url, datetime, notify_at, notified
+                   COALESCE(source, 'manual'), external_id, url, datetime, {NOTIFY_AT_TO_EPOCH_SQL}, notified
             FROM shows
         """)
         cursor.execute("DROP TABLE shows")
@@ -105,13 +219,13 @@ def init_db():
                 external_id INTEGER,
                 url TEXT,
                 datetime TEXT,
-                notify_at TEXT,
+                notify_at INTEGER,
                 notified INTEGER DEFAULT 0,
                 FOREIGN KEY (user_id) REFERENCES users(user_id)
             )
         """)
         cursor.execute("""
-            INSERT INTO shows 
+            INSERT INTO shows
             SELECT id, user_id, theatre, show_name, show_date, created_at,
                    source, external_id, url, datetime, notify_at, notified
             FROM shows_backup
@@ -122,23 +236,84 @@ def init_db():
         # Если ошибка не связана с отсутствием city, игнорируем
         if "no such column: city" not in str(e).lower():
             pass
-    
-    conn.commit()
-    conn.close()
 
 
 def add_user(user_id: int, username: Optional[str] = None, first_name: Optional[str] = None):
     """Добавляет или обновляет пользователя в базе данных."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        INSERT OR REPLACE INTO users (user_id, username, first_name, created_at)
-        VALUES (?, ?, ?, ?)
-    """, (user_id, username, first_name, datetime.now()))
-    
-    conn.commit()
-    conn.close()
+    with borrow() as conn:
+        cursor = conn.cursor()
+        
+        # created_at заполняется DEFAULT CURRENT_TIMESTAMP при первой вставке и дальше не меняется
+        cursor.execute("""
+            INSERT INTO users (user_id, username, first_name)
+            VALUES (?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                username = excluded.username,
+                first_name = excluded.first_name
+        """, (user_id, username, first_name))
+        
+        conn.commit()
+
+
+# Запрос вставки спектакля (общий для одиночной и массовой вставки)
+INSERT_SHOW_SQL = """
+    INSERT INTO shows (user_id, theatre, show_name, show_date, source, external_id, url, datetime, notify_at, notified)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+"""
+
+# Лимит параметров в одном запросе (SQLITE_MAX_VARIABLE_NUMBER по умолчанию)
+SQLITE_MAX_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+# Количество параметров одной строки в INSERT_SHOW_SQL
+SHOW_PARAMS_PER_ROW = 9
+
+# Строк в одном многострочном INSERT ... VALUES (...), (...), ...
+MULTI_VALUES_ROWS = SQLITE_MAX_VARIABLES // SHOW_PARAMS_PER_ROW
+
+# Многострочный INSERT для полных пачек (текст запроса постоянный, поэтому он кэшируется)
+INSERT_SHOWS_MULTI_SQL = (
+    "INSERT INTO shows (user_id, theatre, show_name, show_date, source, external_id, url, datetime, notify_at, notified) "
+    "VALUES " + ", ".join(["(?, ?, ?, ?, ?, ?, ?, ?, ?, 0)"] * MULTI_VALUES_ROWS)
+)
+
+# Вставка пачки спектаклей из одного JSON-параметра (цикл по строкам выполняется внутри SQLite)
+INSERT_SHOWS_JSON_SQL = """
+    INSERT INTO shows (user_id, theatre, show_name, show_date, source, external_id, url, datetime, notify_at, notified)
+    SELECT json_extract(value, '$.user_id'),
+           json_extract(value, '$.theatre'),
+           json_extract(value, '$.show_name'),
+           json_extract(value, '$.show_date'),
+           json_extract(value, '$.source'),
+           json_extract(value, '$.external_id'),
+           json_extract(value, '$.url'),
+           json_extract(value, '$.datetime'),
+           json_extract(value, '$.notify_at'),
+           0
+    FROM json_each(?)
+"""
+
+# Имена полей JSON-объекта в порядке параметров _show_params
+SHOW_JSON_FIELDS = (
+    'user_id', 'theatre', 'show_name', 'show_date', 'source',
+    'external_id', 'url', 'datetime', 'notify_at',
+)
+
+
+def _show_params(row: dict) -> tuple:
+    """Преобразует словарь спектакля (ключи как у add_show) в параметры INSERT_SHOW_SQL."""
+    show_date = row['show_date']
+    return (
+        row['user_id'],
+        row['theatre'],
+        row['show_name'],
+        show_date,
+        row.get('source', 'manual'),
+        row.get('external_id'),
+        row.get('url'),
+        # Если datetime_str не указан, используем show_date
+        row.get('datetime_str') or show_date,
+        row.get('notify_at'),
+    )
 
 
 def add_show(
@@ -150,7 +325,7 @@ def add_show(
     external_id: Optional[int] = None,
     url: Optional[str] = None,
     datetime_str: Optional[str] = None,
-    notify_at: Optional[str] = None
+    notify_at: Optional[int] = None
 ) -> int:
     """
     Добавляет спектакль в базу данных. Возвращает ID созданной записи.
@@ -164,79 +339,226 @@ def add_show(
         external_id: ID события из внешнего источника (KudaGo)
         url: URL события
         datetime_str: Дата и время в формате YYYY-MM-DD HH:MM:SS
-        notify_at: Время напоминания в формате YYYY-MM-DD HH:MM:SS
+        notify_at: Время напоминания в секундах Unix epoch (UTC)
+    """
+    params = _show_params({
+        'user_id': user_id,
+        'theatre': theatre,
+        'show_name': show_name,
+        'show_date': show_date,
+        'source': source,
+        'external_id': external_id,
+        'url': url,
+        'datetime_str': datetime_str,
+        'notify_at': notify_at,
+    })
+    
+    with borrow() as conn:
+        cursor = conn.cursor()
+        # lastrowid доступен только после execute(), поэтому одиночная вставка не идет через executemany
+        cursor.execute(INSERT_SHOW_SQL, params)
+        show_id = cursor.lastrowid
+        conn.commit()
+    
+    _invalidate_user_shows(user_id)
+    return show_id
+
+
+def add_shows_bulk(rows: List[dict]) -> int:
     """
-    conn = get_connection()
-    cursor = conn.cursor()
+    Добавляет несколько спектаклей одной транзакцией. Возвращает количество добавленных записей.
     
-    # Если datetime_str не указан, используем show_date
-    if not datetime_str:
-        datetime_str = show_date
+    Args:
+        rows: Список словарей с ключами как у аргументов add_show
+              (user_id, theatre, show_name, show_date, source, external_id, url, datetime_str, notify_at)
+    """
+    if not rows:
+        return 0
+    
+    full_batches_end = len(rows) - len(rows) % MULTI_VALUES_ROWS
+    
+    with borrow() as conn:
+        conn.execute("BEGIN")
+        # Полные пачки - одним многострочным INSERT (одна компиляция и один шаг на пачку)
+        for start in range(0, full_batches_end, MULTI_VALUES_ROWS):
+            batch = rows[start:start + MULTI_VALUES_ROWS]
+            conn.execute(INSERT_SHOWS_MULTI_SQL, [value for row in batch for value in _show_params(row)])
+        # Остаток - через executemany по подготовленному однострочному запросу
+        if full_batches_end < len(rows):
+            conn.executemany(INSERT_SHOW_SQL, [_show_params(row) for row in rows[full_batches_end:]])
+        conn.commit()
+    
+    _invalidate_user_shows(*{row['user_id'] for row in rows})
+    return len(rows)
+
+
+@contextmanager
+def show_appender() -> Iterator[Callable[..., None]]:
+    """
+    Контекстный менеджер для импорта: накапливает спектакли и записывает их одной транзакцией при выходе.
+    Если внутри блока возникло исключение, ничего не записывается.
     
-    cursor.execute("""
-        INSERT INTO shows (user_id, theatre, show_name, show_date, source, external_id, url, datetime, notify_at, notified)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
-    """, (user_id, theatre, show_name, show_date, source, external_id, url, datetime_str, notify_at))
+    Пример:
+        with show_appender() as append:
+            for show in shows:
+                append(user_id=user_id, theatre=show['place'], show_name=show['short_title'], show_date=date)
+    """
+    rows = []
     
-    show_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    def append(**show) -> None:
+        rows.append(show)
     
-    return show_id
+    yield append
+    add_shows_bulk(rows)
 
 
-def get_user_shows(user_id: int) -> List[dict]:
-    """Получает все спектакли пользователя."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT id, theatre, show_name, show_date, created_at, source, external_id, url, datetime, notify_at, notified
-        FROM shows
-        WHERE user_id = ?
-        ORDER BY COALESCE(datetime, show_date) ASC, created_at DESC
-    """, (user_id,))
+def add_shows_json(rows: List[dict]) -> int:
+    """
+    Добавляет несколько спектаклей одним запросом через json_each. Возвращает количество добавленных записей.
     
-    rows = cursor.fetchall()
-    conn.close()
+    В отличие от add_shows_bulk не ограничен количеством параметров запроса:
+    вся пачка передается одним JSON-параметром.
     
-    return [dict(row) for row in rows]
+    Args:
+        rows: Список словарей с ключами как у аргументов add_show
+    """
+    if not rows:
+        return 0
+    
+    payload = json.dumps(
+        [dict(zip(SHOW_JSON_FIELDS, _show_params(row))) for row in rows],
+        ensure_ascii=False
+    )
+    
+    with borrow() as conn:
+        cursor = conn.cursor()
+        cursor.execute(INSERT_SHOWS_JSON_SQL, (payload,))
+        inserted = cursor.rowcount
+        conn.commit()
+    
+    _invalidate_user_shows(*{row['user_id'] for row in rows})
+    return inserted
 
 
-def get_show_by_id(show_id: int, user_id: int) -> Optional[dict]:
-    """Получает спектакль по ID, если он принадлежит пользователю."""
-    conn = get_connection()
-    cursor = conn.cursor()
+def bulk_load(rows: List[dict]) -> int:
+    """
+    Массовая загрузка спектаклей: индексы BULK_LOAD_INDEXES удаляются на время вставки
+    и строятся заново после нее. Возвращает количество добавленных записей.
     
-    cursor.execute("""
-        SELECT id, theatre, show_name, show_date, created_at, source, external_id, url, datetime, notify_at, notified
-        FROM shows
-        WHERE id = ? AND user_id = ?
-    """, (show_id, user_id))
+    Args:
+        rows: Список словарей с ключами как у аргументов add_show
+    """
+    with borrow() as conn:
+        for index_name in BULK_LOAD_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {index_name}")
     
-    row = cursor.fetchone()
-    conn.close()
+    try:
+        return add_shows_bulk(rows)
+    finally:
+        with borrow() as conn:
+            for index_name in BULK_LOAD_INDEXES:
+                conn.execute(SHOW_INDEXES[index_name])
+            conn.commit()
+
+
+def get_user_shows(user_id: int, limit: Optional[int] = None, offset: int = 0) -> List[Row]:
+    """
+    Получает спектакли пользователя (полный список кэшируется до изменения его спектаклей).
     
-    return dict(row) if row else None
+    Args:
+        user_id: ID пользователя
+        limit: Максимальное количество спектаклей (None = все)
+        offset: Сколько спектаклей пропустить от начала списка
+    """
+    with _cache_lock:
+        cached = _user_shows_cache.get(user_id)
+        if cached is not None:
+            _user_shows_cache.move_to_end(user_id)
+            return cached[offset:offset + limit] if limit is not None else cached[offset:]
+        generation = _user_shows_generation
+    
+    # Страница списка запрашивается из БД напрямую и не кэшируется
+    is_full_list = limit is None and offset == 0
+    
+    with borrow() as conn:
+        cursor = conn.cursor()
+        
+        # Сортировка совпадает с порядком индекса idx_shows_user: отдельный шаг сортировки не нужен
+        cursor.execute("""
+            SELECT id, theatre, show_name, show_date, created_at, source, external_id, url, datetime, notify_at, notified
+            FROM shows
+            WHERE user_id = ?
+            ORDER BY datetime ASC, created_at DESC
+            LIMIT ? OFFSET ?
+        """, (user_id, -1 if limit is None else limit, offset))
+        
+        shows = cursor.fetchall()
+    
+    if is_full_list:
+        with _cache_lock:
+            if generation == _user_shows_generation:
+                _user_shows_cache[user_id] = shows
+                if len(_user_shows_cache) > USER_SHOWS_CACHE_SIZE:
+                    _user_shows_cache.popitem(last=False)
+    
+    return list(shows)
+
+
+def get_show_by_id(show_id: int, user_id: int) -> Optional[Row]:
+    """Получает спектакль по ID, если он принадлежит пользователю."""
+    with borrow() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT id, theatre, show_name, show_date, created_at, source, external_id, url, datetime, notify_at, notified
+            FROM shows
+            WHERE id = ? AND user_id = ?
+        """, (show_id, user_id))
+        
+        row = cursor.fetchone()
+    
+    return row
 
 
 def delete_show(show_id: int, user_id: int) -> bool:
     """Удаляет спектакль, если он принадлежит пользователю. Возвращает True если удален."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        DELETE FROM shows
-        WHERE id = ? AND user_id = ?
-    """, (show_id, user_id))
-    
-    deleted = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
-    
+    with borrow() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            DELETE FROM shows
+            WHERE id = ? AND user_id = ?
+        """, (show_id, user_id))
+        
+        deleted = cursor.rowcount > 0
+        conn.commit()
+    
+    if deleted:
+        _invalidate_user_shows(user_id)
     return deleted
 
 
+# Обновление спектакля одним запросом постоянного вида: NULL в параметре означает "не менять"
+UPDATE_SHOW_SQL = """
+    UPDATE shows
+    SET theatre = COALESCE(:theatre, theatre),
+        show_name = COALESCE(:show_name, show_name),
+        show_date = COALESCE(:show_date, show_date),
+        datetime = COALESCE(:datetime, datetime),
+        notify_at = CASE
+            WHEN :notify_at IS NULL THEN notify_at
+            WHEN :notify_at = '' THEN NULL
+            ELSE :notify_at
+        END,
+        notified = CASE
+            WHEN :notified IS NOT NULL THEN :notified
+            WHEN :notify_at IS NOT NULL THEN 0
+            ELSE notified
+        END
+    WHERE id = :show_id AND user_id = :user_id
+"""
+
+
 def update_show(
     show_id: int,
     user_id: int,
@@ -244,75 +566,46 @@ def update_show(
     show_name: Optional[str] = None,
     show_date: Optional[str] = None,
     datetime_str: Optional[str] = None,
-    notify_at: Optional[str] = None,
+    notify_at: Union[int, str, None] = None,
     notified: Optional[int] = None
 ) -> bool:
-    """Обновляет данные спектакля. Возвращает True если обновлен."""
-    import logging
-    logger = logging.getLogger(__name__)
-    
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Формируем запрос динамически на основе переданных параметров
-    updates = []
-    params = []
-    
-    if theatre is not None:
-        updates.append("theatre = ?")
-        params.append(theatre)
-    
-    if show_name is not None:
-        updates.append("show_name = ?")
-        params.append(show_name)
-    
-    if show_date is not None:
-        updates.append("show_date = ?")
-        params.append(show_date)
-    
-    if datetime_str is not None:
-        updates.append("datetime = ?")
-        params.append(datetime_str)
-    
-    # Обработка notify_at: если передана строка - устанавливаем, если пустая строка - удаляем
-    if notify_at is not None:
-        if notify_at == "":
-            # Удаляем напоминание
-            updates.append("notify_at = NULL")
-            updates.append("notified = 0")
-            logger.info(f"Удаление напоминания для спектакля {show_id}, пользователь {user_id}")
-        else:
-            # Устанавливаем напоминание
-            updates.append("notify_at = ?")
-            params.append(notify_at)
-            # При обновлении notify_at сбрасываем notified
-            updates.append("notified = 0")
-            logger.info(f"Установка напоминания для спектакля {show_id}, пользователь {user_id}, notify_at={notify_at}")
-    
-    if notified is not None:
-        updates.append("notified = ?")
-        params.append(notified)
-    
-    if not updates:
-        conn.close()
-        logger.warning(f"Нет обновлений для спектакля {show_id}, пользователь {user_id}")
-        return False
-    
-    params.extend([show_id, user_id])
+    """
+    Обновляет данные спектакля. Возвращает True если обновлен.
     
-    query = f"""
-        UPDATE shows
-        SET {', '.join(updates)}
-        WHERE id = ? AND user_id = ?
+    notify_at задается в секундах Unix epoch (UTC); пустая строка удаляет напоминание.
     """
     
-    logger.debug(f"Выполнение запроса: {query}, параметры: {params}")
-    cursor.execute(query, params)
-    updated = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
+    if all(value is None for value in (theatre, show_name, show_date, datetime_str, notify_at, notified)):
+        logger.warning(f"Нет обновлений для спектакля {show_id}, пользователь {user_id}")
+        return False
+    
+    # Обработка notify_at: если передано время - устанавливаем, если пустая строка - удаляем
+    # (в обоих случаях notified сбрасывается, если notified не передан явно)
+    if notify_at == "":
+        logger.info(f"Удаление напоминания для спектакля {show_id}, пользователь {user_id}")
+    elif notify_at is not None:
+        logger.info(f"Установка напоминания для спектакля {show_id}, пользователь {user_id}, notify_at={notify_at}")
+    
+    params = {
+        'show_id': show_id,
+        'user_id': user_id,
+        'theatre': theatre,
+        'show_name': show_name,
+        'show_date': show_date,
+        'datetime': datetime_str,
+        'notify_at': notify_at,
+        'notified': notified,
+    }
+    
+    logger.debug(f"Обновление спектакля, параметры: {params}")
+    with borrow() as conn:
+        cursor = conn.cursor()
+        cursor.execute(UPDATE_SHOW_SQL, params)
+        updated = cursor.rowcount > 0
+        conn.commit()
     
     if updated:
+        _invalidate_user_shows(user_id)
         logger.info(f"Спектакль {show_id} успешно обновлен для пользователя {user_id}")
     else:
         logger.warning(f"Спектакль {show_id} не найден или не обновлен для пользователя {user_id}")
@@ -320,53 +613,79 @@ def update_show(
     return updated
 
 
-def get_theatres_stats() -> List[dict]:
-    """Возвращает список театров и количества спектаклей (по всем пользователям)."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT theatre, COUNT(*) as cnt
-        FROM shows
-        GROUP BY theatre
-        ORDER BY cnt DESC, theatre ASC
-        LIMIT 100
-    """)
-    rows = cursor.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+def get_theatres_stats() -> List[Row]:
+    """Возвращает список театров и количества спектаклей (по всем пользователям), кэш на THEATRES_STATS_TTL секунд."""
+    global _theatres_stats_cache
+    cached = _theatres_stats_cache
+    if cached is not None and time.monotonic() - cached[0] < THEATRES_STATS_TTL:
+        return list(cached[1])
+    
+    with borrow() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT theatre, COUNT(*) as cnt
+            FROM shows
+            GROUP BY theatre
+            ORDER BY cnt DESC, theatre ASC
+            LIMIT 100
+        """)
+        stats = cursor.fetchall()
+    _theatres_stats_cache = (time.monotonic(), stats)
+    return list(stats)
 
 
-def get_pending_notifications(current_time: str) -> List[dict]:
-    """Получает все спектакли с неотправленными напоминаниями, которые должны быть отправлены до указанного времени."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT id, user_id, theatre, show_name, show_date, datetime, notify_at
-        FROM shows
-        WHERE notify_at IS NOT NULL 
-          AND notify_at <= ?
-          AND notified = 0
-        ORDER BY notify_at ASC
-    """, (current_time,))
-    
-    rows = cursor.fetchall()
-    conn.close()
+def get_pending_notifications(current_time: int) -> List[Row]:
+    """
+    Получает все спектакли с неотправленными напоминаниями, которые должны быть отправлены до указанного времени.
     
-    return [dict(row) for row in rows]
+    Args:
+        current_time: Текущее время в секундах Unix epoch (UTC)
+    """
+    with borrow() as conn:
+        cursor = conn.cursor()
+        
+        # Частичный индекс idx_shows_pending содержит только строки с напоминаниями
+        cursor.execute("""
+            SELECT id, user_id, theatre, show_name, show_date, datetime, notify_at
+            FROM shows INDEXED BY idx_shows_pending
+            WHERE notified = 0
+              AND notify_at IS NOT NULL
+              AND notify_at <= ?
+            ORDER BY notify_at ASC
+        """, (current_time,))
+        
+        rows = cursor.fetchall()
+    
+    return rows
 
 
 def mark_notification_sent(show_id: int) -> None:
     """Отмечает напоминание как отправленное."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        UPDATE shows
-        SET notified = 1
-        WHERE id = ?
-    """, (show_id,))
-    
-    conn.commit()
-    conn.close()
+    mark_notifications_sent([show_id])
+
 
+def mark_notifications_sent(show_ids: List[int]) -> None:
+    """Отмечает напоминания указанных спектаклей как отправленные (одной транзакцией)."""
+    if not show_ids:
+        return
+    
+    user_ids = set()
+    with borrow() as conn:
+        cursor = conn.cursor()
+        
+        for start in range(0, len(show_ids), SQLITE_MAX_VARIABLES):
+            batch = show_ids[start:start + SQLITE_MAX_VARIABLES]
+            placeholders = ", ".join("?" * len(batch))
+            
+            cursor.execute(f"SELECT DISTINCT user_id FROM shows WHERE id IN ({placeholders})", batch)
+            user_ids.update(row['user_id'] for row in cursor.fetchall())
+            
+            cursor.execute(f"""
+                UPDATE shows
+                SET notified = 1
+                WHERE id IN ({placeholders})
+            """, batch)
+        
+        conn.commit()
+    
+    _invalidate_user_shows(*user_ids)
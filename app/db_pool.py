@@ -0,0 +1,76 @@
+"""Пул соединений с SQLite базой данных."""
+import queue
+import sqlite3
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.config import DB_PATH
+
+# Максимальное количество соединений, хранимых в пуле
+POOL_SIZE = 8
+
+# LIFO: последним возвращенное ("прогретое") соединение выдается первым
+_POOL: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=POOL_SIZE)
+
+# Размер кэша подготовленных запросов на одно соединение
+CACHED_STATEMENTS = 256
+
+# Настройки соединения: WAL-журнал, fsync только на checkpoint,
+# временные таблицы в памяти, кэш страниц 64 МБ и mmap на 256 МБ
+CONNECTION_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-65536;
+    PRAGMA mmap_size=268435456;
+"""
+
+
+class Row(sqlite3.Row):
+    """Строка результата запроса: sqlite3.Row с dict-подобным методом get."""
+    
+    __slots__ = ()
+    
+    def get(self, key: str, default=None):
+        """Возвращает значение колонки key или default, если такой колонки нет."""
+        try:
+            return self[key]
+        except IndexError:
+            return default
+
+
+def _connect() -> sqlite3.Connection:
+    """Открывает новое соединение с базой данных."""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, cached_statements=CACHED_STATEMENTS)
+    conn.row_factory = Row
+    conn.executescript(CONNECTION_PRAGMAS)
+    return conn
+
+
+def get_connection() -> sqlite3.Connection:
+    """Возвращает соединение из пула или открывает новое, если пул пуст."""
+    try:
+        return _POOL.get_nowait()
+    except queue.Empty:
+        return _connect()
+
+
+def release_connection(conn: sqlite3.Connection) -> None:
+    """Возвращает соединение в пул (или закрывает его, если пул заполнен)."""
+    # Незавершенная транзакция не должна попасть к следующему владельцу
+    if conn.in_transaction:
+        conn.rollback()
+    try:
+        _POOL.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+
+@contextmanager
+def borrow() -> Iterator[sqlite3.Connection]:
+    """Контекстный менеджер: берет соединение из пула и возвращает его обратно."""
+    conn = get_connection()
+    try:
+        yield conn
+    finally:
+        release_connection(conn)
@@ -1,68 +1,83 @@
 """Утилиты для экспорта спектаклей в TXT файлы."""
+import asyncio
+import io
+import time
 from pathlib import Path
-from typing import List, Optional
-from datetime import datetime, timezone
+from typing import List, Optional, TextIO, Tuple, Union
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 from app.config import EXPORT_DIR
 
 # Часовой пояс пользователя (Москва UTC+3)
 MOSCOW_TZ = ZoneInfo("Europe/Moscow")
 
-def format_datetime_for_user(dt: datetime) -> str:
-    """Форматирует datetime для отображения пользователю в московском времени."""
-    if isinstance(dt, str):
-        dt = datetime.fromisoformat(dt.replace('Z', '+00:00'))
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=timezone.utc)
-    moscow_dt = dt.astimezone(MOSCOW_TZ)
-    return moscow_dt.strftime('%d.%m.%Y %H:%M')
+# С 26.10.2014 Москва живет по постоянному UTC+3 без перехода на летнее время,
+# поэтому для отображения дат после этого момента достаточно сдвига на константу
+_MSK_OFFSET = timedelta(hours=3)
+_MSK_FIXED_OFFSET_SINCE = datetime(2014, 10, 25, 22, 0, tzinfo=timezone.utc)
 
+# Размер кэша отформатированных для пользователя дат
+FORMAT_CACHE_SIZE = 4096
 
-def generate_txt(shows: List[dict], user_id: int, single_show: Optional[dict] = None) -> Path:
+# Форматы дат каталога и БД для strptime (YYYY-MM-DD HH:MM:SS и YYYY-MM-DD)
+DB_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+DB_DATE_FORMAT = '%Y-%m-%d'
+
+# Размер буфера записи файла экспорта
+EXPORT_BUFFER_SIZE = 1 << 16
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def format_datetime_for_user(dt_utc: Union[datetime, str]) -> str:
     """
-    Генерирует TXT файл со спектаклями в читаемом формате.
-    
-    Args:
-        shows: Список словарей со спектаклями
-        user_id: ID пользователя
-        single_show: Если указан, экспортирует только этот спектакль
+    Форматирует datetime объект из UTC в московское время для отображения пользователю.
     
-    Returns:
-        Path к созданному файлу
+    Принимает также строку в ISO-формате (в том числе с суффиксом Z).
+    Время 00:00 по Москве не выводится: показывается только дата.
     """
-    if single_show:
-        shows = [single_show]
+    if isinstance(dt_utc, str):
+        dt_utc = datetime.fromisoformat(dt_utc.replace('Z', '+00:00'))
+    if dt_utc.tzinfo is None:
+        # Если datetime наивный, предполагаем, что это UTC (как хранится в БД)
+        dt_utc = dt_utc.replace(tzinfo=timezone.utc)
     
-    if not shows:
-        raise ValueError("Нет спектаклей для экспорта")
-    
-    # Создаем имя файла с timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    if single_show:
-        filename = f"show_{single_show['id']}_{timestamp}.txt"
+    if dt_utc.tzinfo is timezone.utc and dt_utc >= _MSK_FIXED_OFFSET_SINCE:
+        # Быстрый путь: для форматирования нужны только поля даты и времени
+        dt_moscow = dt_utc + _MSK_OFFSET
     else:
-        filename = f"shows_user_{user_id}_{timestamp}.txt"
+        dt_moscow = dt_utc.astimezone(MOSCOW_TZ)
     
-    file_path = EXPORT_DIR / filename
-    
-    # Сортируем спектакли по дате (хронологически)
-    def get_show_datetime(show):
-        dt_str = show.get('datetime') or show.get('show_date', '')
-        try:
-            if ' ' in dt_str:
-                return datetime.strptime(dt_str, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
-            else:
-                return datetime.strptime(dt_str, '%Y-%m-%d').replace(tzinfo=timezone.utc)
-        except:
-            return datetime.max.replace(tzinfo=timezone.utc)  # Спектакли без даты в конец
+    # Проверяем, есть ли время (не равно 00:00:00)
+    if dt_moscow.hour == 0 and dt_moscow.minute == 0 and dt_moscow.second == 0:
+        return f"{dt_moscow.day:02d}.{dt_moscow.month:02d}.{dt_moscow.year:04d}"
+    return f"{dt_moscow.day:02d}.{dt_moscow.month:02d}.{dt_moscow.year:04d} {dt_moscow.hour:02d}:{dt_moscow.minute:02d}"
+
+
+def _export_filename(user_id: int, single_show: Optional[dict] = None) -> str:
+    """Возвращает имя файла экспорта с timestamp."""
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    if single_show:
+        return f"show_{single_show['id']}_{timestamp}.txt"
+    return f"shows_user_{user_id}_{timestamp}.txt"
+
+
+def _write_txt(f: TextIO, shows: List[dict]) -> None:
+    """
+    Записывает спектакли в читаемом TXT формате в текстовый поток.
     
-    shows_sorted = sorted(shows, key=get_show_datetime)
+    Args:
+        f: Текстовый поток (файл или io.StringIO)
+        shows: Список словарей со спектаклями
+    """
+    # Сортируем спектакли по дате (хронологически): строки YYYY-MM-DD и YYYY-MM-DD HH:MM:SS
+    # упорядочиваются лексикографически так же, как даты, поэтому парсить их для сортировки не нужно
+    shows_sorted = sorted(
+        shows,
+        key=lambda show: show.get('datetime') or show.get('show_date') or '\uffff'  # Спектакли без даты в конец
+    )
     
-    # Генерируем содержимое TXT в читаемом формате
-    lines = []
-    lines.append("МОИ СПЕКТАКЛИ")
-    lines.append("=" * 50)
-    lines.append("")
+    f.write("МОИ СПЕКТАКЛИ\n")
+    f.write("=" * 50 + "\n\n")
     
     # Формируем содержимое
     for idx, show in enumerate(shows_sorted, 1):
@@ -70,29 +85,80 @@ def generate_txt(shows: List[dict], user_id: int, single_show: Optional[dict] =
         show_datetime_str = show.get('datetime') or show.get('show_date', 'Не указано')
         try:
             if ' ' in show_datetime_str:
-                dt = datetime.strptime(show_datetime_str, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
-                formatted_date = format_datetime_for_user(dt)
+                dt = datetime.strptime(show_datetime_str, DB_DATETIME_FORMAT)
             else:
-                dt = datetime.strptime(show_datetime_str, '%Y-%m-%d').replace(tzinfo=timezone.utc)
-                formatted_date = format_datetime_for_user(dt)
-        except:
+                dt = datetime.strptime(show_datetime_str, DB_DATE_FORMAT)
+            formatted_date = format_datetime_for_user(dt.replace(tzinfo=timezone.utc))
+        except ValueError:
             formatted_date = show_datetime_str
         
-        lines.append(f"{idx}. {show['show_name']}")
-        lines.append(f"   Театр: {show['theatre']}")
-        lines.append(f"   Дата: {formatted_date}")
-        lines.append("")
+        f.write(
+            f"{idx}. {show['show_name']}\n"
+            f"   Театр: {show['theatre']}\n"
+            f"   Дата: {formatted_date}\n\n"
+        )
+    
+    f.write("=" * 50 + "\n")
+    f.write(f"Всего: {len(shows)} спектаклей")
+
+
+def build_txt_export(shows: List[dict], user_id: int, single_show: Optional[dict] = None) -> Tuple[str, bytes]:
+    """
+    Формирует TXT экспорт спектаклей в памяти, без записи на диск.
+    
+    Args:
+        shows: Список словарей со спектаклями
+        user_id: ID пользователя
+        single_show: Если указан, экспортирует только этот спектакль
+    
+    Returns:
+        Кортеж (имя файла, содержимое в UTF-8)
+    """
+    if single_show:
+        shows = [single_show]
+    
+    if not shows:
+        raise ValueError("Нет спектаклей для экспорта")
+    
+    buffer = io.StringIO()
+    _write_txt(buffer, shows)
+    return _export_filename(user_id, single_show), buffer.getvalue().encode('utf-8')
+
+
+def generate_txt(shows: List[dict], user_id: int, single_show: Optional[dict] = None) -> Path:
+    """
+    Генерирует TXT файл со спектаклями в читаемом формате.
     
-    lines.append("=" * 50)
-    lines.append(f"Всего: {len(shows)} спектаклей")
+    Args:
+        shows: Список словарей со спектаклями
+        user_id: ID пользователя
+        single_show: Если указан, экспортирует только этот спектакль
     
-    # Записываем файл
-    content = "\n".join(lines)
-    file_path.write_text(content, encoding='utf-8')
+    Returns:
+        Path к созданному файлу
+    """
+    if single_show:
+        shows = [single_show]
+    
+    if not shows:
+        raise ValueError("Нет спектаклей для экспорта")
+    
+    file_path = EXPORT_DIR / _export_filename(user_id, single_show)
+    
+    # Генерируем содержимое TXT в читаемом формате, сразу записывая его в файл через буфер
+    with open(file_path, 'w', encoding='utf-8', buffering=EXPORT_BUFFER_SIZE) as f:
+        _write_txt(f, shows)
     
     return file_path
 
 
+async def build_txt_export_async(
+    shows: List[dict], user_id: int, single_show: Optional[dict] = None
+) -> Tuple[str, bytes]:
+    """Асинхронная обертка над build_txt_export: форматирование выполняется в отдельном потоке, не блокируя event loop."""
+    return await asyncio.to_thread(build_txt_export, shows, user_id, single_show)
+
+
 # Для обратной совместимости
 def generate_markdown(shows: List[dict], user_id: int, single_show: Optional[dict] = None) -> Path:
     """Алиас для generate_txt (обратная совместимость)."""
@@ -1,8 +1,19 @@
 """Модуль для работы с API KudaGo."""
+import asyncio
+import httpx
+import orjson
 import requests
 import logging
-from typing import List, Dict, Optional
-from datetime import datetime
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from datetime import date, datetime
+from datetime import time as dt_time
 from datetime import timezone as tz
 
 logger = logging.getLogger(__name__)
@@ -10,6 +21,106 @@ logger = logging.getLogger(__name__)
 # Базовый URL API KudaGo
 BASE_URL = "https://kudago.com/public-api/v1.4"
 
+# User-Agent, с которым клиент ходит в API
+USER_AGENT = 'TheatreNotifyBot/1.0'
+
+# Поля события, запрашиваемые по умолчанию: только то, что читает extract_show_info.
+# Без fields API отдает body_text, description, images и т.п.
+DEFAULT_EVENT_FIELDS = 'id,short_title,title,place,dates,daterange,location'
+
+# Максимальный размер страницы, который отдает API
+PAGE_SIZE = 100
+
+# Количество страниц, загружаемых параллельно
+MAX_PAGE_WORKERS = 8
+
+# Количество мест, загружаемых параллельно в extract_show_info_batch
+MAX_PLACE_WORKERS = 16
+
+# Общий лимит одновременных запросов клиента (чтобы не получать 429 от KudaGo)
+MAX_CONCURRENT_REQUESTS = 16
+
+# Размер пула keep-alive соединений сессии
+HTTP_POOL_SIZE = 32
+
+# Время простоя keep-alive соединения до закрытия (у httpx по умолчанию 5 секунд)
+HTTP_KEEPALIVE_EXPIRY = 30.0
+
+# Лимиты соединений асинхронного клиента
+ASYNC_HTTP_LIMITS = httpx.Limits(
+    max_keepalive_connections=HTTP_POOL_SIZE,
+    max_connections=64,
+    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+)
+
+# Таймаут запросов асинхронного клиента, секунды
+ASYNC_HTTP_TIMEOUT = 10.0
+
+# Время жизни кэша справочников (города, категории), секунды
+REFERENCE_CACHE_TTL = 3600
+
+# Время жизни кэша результатов поиска, секунды
+SEARCH_CACHE_TTL = 300
+
+# Время жизни кэша деталей событий (расписание может меняться), секунды
+EVENT_DETAILS_CACHE_TTL = 600
+
+# Время жизни записи о неудачном запросе деталей места/события, секунды
+NEGATIVE_CACHE_TTL = 60
+
+# Названия месяцев в родительном падеже для меток расписания
+RU_MONTHS = (
+    'января', 'февраля', 'марта', 'апреля', 'мая', 'июня',
+    'июля', 'августа', 'сентября', 'октября', 'ноября', 'декабря'
+)
+
+# Верхняя граница валидного Unix timestamp (32 бита)
+MAX_TIMESTAMP = 2147483647
+
+# Повтор запросов при перегрузке и временных ошибках сервера
+HTTP_RETRY = Retry(
+    total=3,
+    backoff_factor=0.3,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=['GET']
+)
+
+# Предельная пауза перед повтором по заголовку Retry-After асинхронного клиента, секунды
+ASYNC_RETRY_AFTER_MAX = 30.0
+
+
+def _parse_iso_date(value: str) -> Optional[date]:
+    """
+    Разбирает дату в формате YYYY-MM-DD.
+    
+    Форма строки проверяется до разбора, поэтому на некорректных значениях
+    не приходится выбрасывать и перехватывать исключения.
+    
+    Returns:
+        Объект date или None, если строка не является корректной датой
+    """
+    if len(value) == 10 and value[4] == '-' and value[7] == '-':
+        try:
+            return date(int(value[:4]), int(value[5:7]), int(value[8:10]))
+        except ValueError:
+            return None
+    return None
+
+
+def _parse_iso_time(value: str) -> Optional[dt_time]:
+    """
+    Разбирает время в формате HH:MM или HH:MM:SS.
+    
+    Returns:
+        Объект time или None, если строка не является корректным временем
+    """
+    if len(value) in (5, 8) and value[2] == ':' and (len(value) == 5 or value[5] == ':'):
+        try:
+            return dt_time(int(value[:2]), int(value[3:5]), int(value[6:8]) if len(value) == 8 else 0)
+        except ValueError:
+            return None
+    return None
+
 
 class KudaGoAPI:
     """Класс для работы с API KudaGo."""
@@ -24,8 +135,70 @@ class KudaGoAPI:
         self.base_url = base_url
         self.session = requests.Session()
         self.session.headers.update({
-            'User-Agent': 'TheatreNotifyBot/1.0'
+            'User-Agent': USER_AGENT
         })
+        # Пул соединений больше стандартного (10), чтобы параллельные запросы
+        # не ждали свободного соединения и не открывали новые TCP/TLS сессии
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_SIZE,
+            pool_maxsize=HTTP_POOL_SIZE,
+            max_retries=HTTP_RETRY
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # Ограничивает число параллельных запросов из пулов потоков
+        self._request_slots = threading.Semaphore(MAX_CONCURRENT_REQUESTS)
+        # Кэш справочников: меняются редко, поэтому не запрашиваем их каждый раз
+        self._cities_cache: Optional[List[Dict]] = None
+        self._cities_cache_ts = 0.0
+        self._city_id_by_name: Dict[str, Optional[int]] = {}
+        # Заголовки условного запроса (If-None-Match/If-Modified-Since) для обновления справочников
+        self._cities_revalidation: Dict[str, str] = {}
+        self._categories_cache: Optional[List[Dict]] = None
+        self._categories_cache_ts = 0.0
+        self._category_id_by_slug: Dict[str, Optional[int]] = {}
+        self._categories_revalidation: Dict[str, str] = {}
+        # Кэш деталей: ключ -> (время получения, данные или None при ошибке)
+        self._place_cache: Dict[int, Tuple[float, Optional[Dict]]] = {}
+        self._event_cache: Dict[Tuple[int, Optional[str], Optional[str]], Tuple[float, Optional[Dict]]] = {}
+        # Кэш поиска: (location, categories, page_size, actual_since) -> [(событие, title, short_title)]
+        self._search_cache: Dict[Tuple, List[Tuple[Dict, str, str]]] = {}
+        # Асинхронный клиент создается при первом async-вызове (в цикле событий вызывающего)
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_slots: Optional[asyncio.Semaphore] = None
+    
+    @staticmethod
+    def _cache_lookup(cache: Dict, key, ttl: float) -> Tuple[bool, Optional[Dict]]:
+        """
+        Ищет запись в кэше деталей.
+        
+        Returns:
+            (True, данные), если запись есть и не устарела, иначе (False, None).
+            Неудачные запросы (None) хранятся NEGATIVE_CACHE_TTL секунд.
+        """
+        entry = cache.get(key)
+        if entry is not None:
+            fetched_at, value = entry
+            if time.monotonic() - fetched_at < (ttl if value is not None else NEGATIVE_CACHE_TTL):
+                return True, value
+        return False, None
+    
+    @staticmethod
+    def _json(response):
+        """Декодирует JSON-тело ответа (requests или httpx) через orjson."""
+        return orjson.loads(response.content)
+    
+    @staticmethod
+    def _revalidation_headers(response) -> Dict[str, str]:
+        """Собирает заголовки условного запроса по ETag/Last-Modified ответа."""
+        headers = {}
+        etag = response.headers.get('ETag')
+        if etag:
+            headers['If-None-Match'] = etag
+        last_modified = response.headers.get('Last-Modified')
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
     
     def get_cities(self) -> List[Dict]:
         """
@@ -34,18 +207,33 @@ class KudaGoAPI:
         Returns:
             Список словарей с информацией о городах
         """
+        if self._cities_cache is not None and time.monotonic() - self._cities_cache_ts < REFERENCE_CACHE_TTL:
+            return self._cities_cache
+        
         try:
             url = f"{self.base_url}/locations/"
-            response = self.session.get(url, params={'lang': 'ru'})
+            # Если справочник уже загружен, просим сервер ответить 304, когда он не изменился
+            response = self.session.get(url, params={'lang': 'ru'}, headers=self._cities_revalidation)
+            if response.status_code == 304 and self._cities_cache is not None:
+                self._cities_cache_ts = time.monotonic()
+                return self._cities_cache
             response.raise_for_status()
-            data = response.json()
+            data = self._json(response)
             # API может вернуть список напрямую или словарь с results
-            if isinstance(data, list):
-                return data
-            return data.get('results', [])
+            cities = data if isinstance(data, list) else data.get('results', [])
         except Exception as e:
             logger.error(f"Ошибка при получении списка городов: {e}")
             return []
+        
+        self._cities_cache = cities
+        self._cities_cache_ts = time.monotonic()
+        self._cities_revalidation = self._revalidation_headers(response)
+        # Индекс для get_city_id; при совпадении названий побеждает первый город, как при линейном поиске
+        city_id_by_name = {}
+        for city in cities:
+            city_id_by_name.setdefault(city.get('name', '').lower(), city.get('id'))
+        self._city_id_by_name = city_id_by_name
+        return cities
     
     def get_city_id(self, city_name: str) -> Optional[int]:
         """
@@ -57,11 +245,8 @@ class KudaGoAPI:
         Returns:
             ID города или None если не найден
         """
-        cities = self.get_cities()
-        for city in cities:
-            if city.get('name', '').lower() == city_name.lower():
-                return city.get('id')
-        return None
+        self.get_cities()
+        return self._city_id_by_name.get(city_name.lower())
     
     def get_event_categories(self) -> List[Dict]:
         """
@@ -70,18 +255,33 @@ class KudaGoAPI:
         Returns:
             Список словарей с информацией о категориях
         """
+        if self._categories_cache is not None and time.monotonic() - self._categories_cache_ts < REFERENCE_CACHE_TTL:
+            return self._categories_cache
+        
         try:
             url = f"{self.base_url}/event-categories/"
-            response = self.session.get(url, params={'lang': 'ru'})
+            # Если справочник уже загружен, просим сервер ответить 304, когда он не изменился
+            response = self.session.get(url, params={'lang': 'ru'}, headers=self._categories_revalidation)
+            if response.status_code == 304 and self._categories_cache is not None:
+                self._categories_cache_ts = time.monotonic()
+                return self._categories_cache
             response.raise_for_status()
-            data = response.json()
+            data = self._json(response)
             # API может вернуть список напрямую или словарь с results
-            if isinstance(data, list):
-                return data
-            return data.get('results', [])
+            categories = data if isinstance(data, list) else data.get('results', [])
         except Exception as e:
             logger.error(f"Ошибка при получении категорий: {e}")
             return []
+        
+        self._categories_cache = categories
+        self._categories_cache_ts = time.monotonic()
+        self._categories_revalidation = self._revalidation_headers(response)
+        # Индекс для get_category_id; при совпадении slug побеждает первая категория
+        category_id_by_slug = {}
+        for category in categories:
+            category_id_by_slug.setdefault(category.get('slug'), category.get('id'))
+        self._category_id_by_slug = category_id_by_slug
+        return categories
     
     def get_category_id(self, category_slug: str) -> Optional[int]:
         """
@@ -93,11 +293,8 @@ class KudaGoAPI:
         Returns:
             ID категории или None если не найдена
         """
-        categories = self.get_event_categories()
-        for category in categories:
-            if category.get('slug') == category_slug:
-                return category.get('id')
-        return None
+        self.get_event_categories()
+        return self._category_id_by_slug.get(category_slug)
     
     def get_event_details(self, event_id: int, fields: Optional[str] = None, expand: Optional[str] = None) -> Optional[Dict]:
         """
@@ -111,6 +308,12 @@ class KudaGoAPI:
         Returns:
             Словарь с детальной информацией о событии или None
         """
+        cache_key = (event_id, fields, expand)
+        hit, event = self._cache_lookup(self._event_cache, cache_key, EVENT_DETAILS_CACHE_TTL)
+        if hit:
+            return event
+        
+        event = None
         try:
             url = f"{self.base_url}/events/{event_id}/"
             params = {'lang': 'ru'}
@@ -123,10 +326,49 @@ class KudaGoAPI:
             
             response = self.session.get(url, params=params)
             response.raise_for_status()
-            return response.json()
+            event = self._json(response)
         except Exception as e:
             logger.debug(f"Ошибка при получении деталей события {event_id}: {e}")
-            return None
+        
+        self._event_cache[cache_key] = (time.monotonic(), event)
+        return event
+    
+    @staticmethod
+    def _events_params(
+        location: Optional[str],
+        categories: Optional[str],
+        page_size: int,
+        page: int,
+        fields: Optional[str],
+        actual_since: Optional[int],
+        expand: Optional[str]
+    ) -> Dict:
+        """Собирает параметры запроса списка событий."""
+        params = {
+            'lang': 'ru',
+            'page_size': min(page_size, 100),  # Максимум 100
+            'page': page
+        }
+        
+        if location:
+            params['location'] = location
+        
+        if categories:
+            params['categories'] = str(categories)
+        
+        # Фильтр по дате - только предстоящие события
+        if actual_since:
+            params['actual_since'] = actual_since
+        
+        # Пробуем без fields сначала, если ошибка - уберем
+        if fields:
+            params['fields'] = fields
+        
+        # Параметр expand для получения детальной информации
+        if expand:
+            params['expand'] = expand
+        
+        return params
     
     def get_events(
         self,
@@ -134,7 +376,7 @@ class KudaGoAPI:
         categories: Optional[str] = None,
         page_size: int = 100,
         page: int = 1,
-        fields: Optional[str] = None,
+        fields: Optional[str] = DEFAULT_EVENT_FIELDS,
         actual_since: Optional[int] = None,
         expand: Optional[str] = None
     ) -> Dict:
@@ -146,7 +388,8 @@ class KudaGoAPI:
             categories: ID категории или несколько через запятую
             page_size: Количество результатов на странице (макс 100)
             page: Номер страницы
-            fields: Поля для включения в ответ (через запятую)
+            fields: Поля для включения в ответ (через запятую). По умолчанию только
+                поля, которые читает extract_show_info; None - событие целиком
             actual_since: Unix timestamp начала периода (только предстоящие события)
         
         Returns:
@@ -154,29 +397,7 @@ class KudaGoAPI:
         """
         try:
             url = f"{self.base_url}/events/"
-            params = {
-                'lang': 'ru',
-                'page_size': min(page_size, 100),  # Максимум 100
-                'page': page
-            }
-            
-            if location:
-                params['location'] = location
-            
-            if categories:
-                params['categories'] = str(categories)
-            
-            # Фильтр по дате - только предстоящие события
-            if actual_since:
-                params['actual_since'] = actual_since
-            
-            # Пробуем без fields сначала, если ошибка - уберем
-            if fields:
-                params['fields'] = fields
-            
-            # Параметр expand для получения детальной информации
-            if expand:
-                params['expand'] = expand
+            params = self._events_params(location, categories, page_size, page, fields, actual_since, expand)
             
             logger.debug(f"Запрос к API: {url} с параметрами: {params}")
             response = self.session.get(url, params=params)
@@ -188,7 +409,7 @@ class KudaGoAPI:
                 response = self.session.get(url, params=params)
             
             response.raise_for_status()
-            return response.json()
+            return self._json(response)
         except Exception as e:
             logger.error(f"Ошибка при получении событий: {e}")
             if hasattr(e, 'response') and e.response is not None:
@@ -199,7 +420,7 @@ class KudaGoAPI:
         self,
         location: Optional[str] = None,
         categories: Optional[str] = None,
-        fields: Optional[str] = None,
+        fields: Optional[str] = DEFAULT_EVENT_FIELDS,
         max_pages: Optional[int] = None,
         actual_since: Optional[int] = None,
         expand: Optional[str] = None
@@ -210,42 +431,85 @@ class KudaGoAPI:
         Args:
             location: Slug города
             categories: ID категории
-            fields: Поля для включения
+            fields: Поля для включения (по умолчанию DEFAULT_EVENT_FIELDS, None - все)
             max_pages: Максимальное количество страниц (None = все)
             actual_since: Unix timestamp начала периода (только предстоящие события)
         
         Returns:
             Список всех событий
         """
-        all_events = []
-        page = 1
+        return list(self.iter_all_events(
+            location=location,
+            categories=categories,
+            fields=fields,
+            max_pages=max_pages,
+            actual_since=actual_since,
+            expand=expand
+        ))
+    
+    def iter_all_events(
+        self,
+        location: Optional[str] = None,
+        categories: Optional[str] = None,
+        fields: Optional[str] = DEFAULT_EVENT_FIELDS,
+        max_pages: Optional[int] = None,
+        actual_since: Optional[int] = None,
+        expand: Optional[str] = None
+    ) -> Iterator[Dict]:
+        """
+        Перебирает все события с пагинацией, отдавая события каждой страницы
+        по мере ее получения (аргументы те же, что у get_all_events).
         
-        while True:
-            if max_pages and page > max_pages:
-                break
-            
-            data = self.get_events(
-                location=location,
-                categories=categories,
-                page=page,
-                fields=fields,
-                actual_since=actual_since,
-                expand=expand
-            )
-            
-            events = data.get('results', [])
-            if not events:
-                break
-            
-            all_events.extend(events)
-            
-            # Проверяем, есть ли следующая страница
-            if not data.get('next'):
-                break
-            
-            page += 1
+        Страницы 2..N загружаются параллельно в фоне, пока потребитель
+        обрабатывает уже полученные события; порядок событий сохраняется.
+        
+        Yields:
+            Словари событий
+        """
+        # Первая страница сообщает общее количество событий
+        data = self.get_events(
+            location=location,
+            categories=categories,
+            page_size=PAGE_SIZE,
+            page=1,
+            fields=fields,
+            actual_since=actual_since,
+            expand=expand
+        )
         
-        return all_events
+        first_page = data.get('results', [])
+        yield from first_page
+        if not first_page or not data.get('next'):
+            return
+        
+        total_pages = math.ceil(data.get('count', 0) / PAGE_SIZE)
+        if max_pages:
+            total_pages = min(total_pages, max_pages)
+        if total_pages < 2:
+            return
+        
+        # Остальные страницы загружаем параллельно через общую сессию
+        # (keep-alive соединения пула urllib3 переиспользуются потоками)
+        def fetch_page(page: int) -> Dict:
+            with self._request_slots:
+                return self.get_events(
+                    location=location,
+                    categories=categories,
+                    page_size=PAGE_SIZE,
+                    page=page,
+                    fields=fields,
+                    actual_since=actual_since,
+                    expand=expand
+                )
+        
+        executor = ThreadPoolExecutor(max_workers=MAX_PAGE_WORKERS)
+        try:
+            # map сохраняет порядок страниц
+            for page_data in executor.map(fetch_page, range(2, total_pages + 1)):
+                yield from page_data.get('results', [])
+        finally:
+            # Если перебор прекращен досрочно, оставшиеся страницы не загружаем
+            executor.shutdown(cancel_futures=True)
     
     def get_place_details(self, place_id: int) -> Optional[Dict]:
         """
@@ -257,22 +521,129 @@ class KudaGoAPI:
         Returns:
             Словарь с информацией о месте или None
         """
+        # Одно место встречается во многих событиях, поэтому детали кэшируются
+        hit, place = self._cache_lookup(self._place_cache, place_id, REFERENCE_CACHE_TTL)
+        if hit:
+            return place
+        
+        place = None
         try:
             url = f"{self.base_url}/places/{place_id}/"
             # Запрашиваем title и name (на случай если используется name)
             response = self.session.get(url, params={'lang': 'ru', 'fields': 'id,title,name'})
             response.raise_for_status()
-            return response.json()
+            place = self._json(response)
         except Exception as e:
             logger.debug(f"Не удалось получить детали места {place_id}: {e}")
-            return None
+        
+        self._place_cache[place_id] = (time.monotonic(), place)
+        return place
+    
+    @staticmethod
+    def _place_id_to_fetch(event: Dict) -> Optional[int]:
+        """Возвращает ID места события, если его название придется запрашивать отдельно."""
+        place = event.get('place')
+        if isinstance(place, dict):
+            if place.get('title') or place.get('name'):
+                return None
+            return place.get('id')
+        if isinstance(place, int):
+            return place
+        return None
+    
+    def _fetch_places(self, place_ids) -> Dict[int, Optional[Dict]]:
+        """
+        Параллельно получает детали мест.
+        
+        Места, уже лежащие в кэше, берутся из него без запуска потоков.
+        
+        Args:
+            place_ids: Уникальные ID мест
+        
+        Returns:
+            Словарь ID места -> детали места (None, если получить не удалось)
+        """
+        place_map = {}
+        missing = []
+        for place_id in place_ids:
+            hit, place = self._cache_lookup(self._place_cache, place_id, REFERENCE_CACHE_TTL)
+            if hit:
+                place_map[place_id] = place
+            else:
+                missing.append(place_id)
+        
+        if not missing:
+            return place_map
+        
+        def fetch_place(place_id: int) -> Optional[Dict]:
+            with self._request_slots:
+                return self.get_place_details(place_id)
+        
+        with ThreadPoolExecutor(max_workers=min(MAX_PLACE_WORKERS, len(missing))) as executor:
+            place_map.update(zip(missing, executor.map(fetch_place, missing)))
+        return place_map
+    
+    def _place_details(self, place_id: int, place_map: Optional[Dict[int, Optional[Dict]]]) -> Optional[Dict]:
+        """Берет детали места из заранее загруженного place_map или запрашивает их у API."""
+        if place_map is None:
+            return self.get_place_details(place_id)
+        return place_map.get(place_id)
+    
+    def extract_show_info(self, event: Dict, current_date: Optional[date] = None) -> Optional[Dict]:
+        """
+        Извлекает информацию о спектакле из события.
+        
+        Args:
+            event: Словарь с данными события
+            current_date: Текущая дата (UTC) для отбора будущих дат; при обработке
+                многих событий передайте ее, чтобы не вычислять заново
+        
+        Returns:
+            Словарь с информацией о спектакле или None
+        """
+        return self._extract_show_info_with_map(event, None, current_date)
+    
+    def extract_show_info_batch(self, events: List[Dict]) -> List[Dict]:
+        """
+        Извлекает информацию о спектаклях из списка событий.
+        
+        Детали мест, не развернутых в событиях, загружаются заранее
+        параллельно, по одному запросу на каждое уникальное место, которого
+        еще нет в кэше. Событие, встретившееся несколько раз (например, на
+        соседних страницах выдачи), обрабатывается один раз.
+        
+        Args:
+            events: Список словарей с данными событий
+        
+        Returns:
+            Список словарей с информацией о спектаклях (события, которые
+            не удалось разобрать, пропускаются)
+        """
+        # dict сохраняет порядок первого появления каждого ID
+        events = list({event.get('id'): event for event in events}.values())
+        
+        needed_ids = {pid for pid in map(self._place_id_to_fetch, events) if pid}
+        place_map = self._fetch_places(needed_ids)
+        current_date = datetime.now(tz.utc).date()
+        
+        # filter(None, ...) отбрасывает события, которые не удалось разобрать, без цикла на Python
+        return list(filter(None, (
+            self._extract_show_info_with_map(event, place_map, current_date) for event in events
+        )))
     
-    def extract_show_info(self, event: Dict) -> Optional[Dict]:
+    def _extract_show_info_with_map(
+        self,
+        event: Dict,
+        place_map: Optional[Dict[int, Optional[Dict]]],
+        current_date: Optional[date] = None
+    ) -> Optional[Dict]:
         """
         Извлекает информацию о спектакле из события.
         
         Args:
             event: Словарь с данными события
+            place_map: Заранее загруженные детали мест (None - запрашивать по необходимости)
+            current_date: Текущая дата (UTC); None - вычислить
         
         Returns:
             Словарь с информацией о спектакле или None
@@ -290,41 +661,20 @@ class KudaGoAPI:
             place = event.get('place')
             place_info = ''
             
-            if place:
-                if isinstance(place, dict):
-                    # Если place развернут (expand), получаем title (или name как fallback)
-                    place_title = place.get('title', '')
-                    place_name = place.get('name', '')
-                    place_id = place.get('id')
-                    
-                    if place_title:
-                        place_info = place_title
-                    elif place_name:
-                        place_info = place_name
-                    elif place_id:
-                        # Если только ID, получаем детали через отдельный запрос
-                        place_details = self.get_place_details(place_id)
-                        if place_details:
-                            place_info = place_details.get('title') or place_details.get('name', '')
-                elif isinstance(place, int):
-                    # Если только ID, получаем детали через отдельный запрос
-                    place_details = self.get_place_details(place)
-                    if place_details:
-                        place_info = place_details.get('title') or place_details.get('name', '')
-            
-            # Если place_info все еще пустое, но есть place_id, пробуем получить через детали события
-            if not place_info:
+            if isinstance(place, dict):
+                # Если place развернут (expand), получаем title (или name как fallback)
+                place_info = place.get('title') or place.get('name') or ''
+                place_id = place.get('id')
+            elif isinstance(place, int):
+                place_id = place
+            else:
                 place_id = None
-                if isinstance(place, dict):
-                    place_id = place.get('id')
-                elif isinstance(place, int):
-                    place_id = place
-                
-                if place_id:
-                    # Получаем детали места через отдельный запрос
-                    place_details = self.get_place_details(place_id)
-                    if place_details:
-                        place_info = place_details.get('title') or place_details.get('name', '')
+            
+            if not place_info and place_id:
+                # Если известен только ID, получаем детали одним отдельным запросом
+                place_details = self._place_details(place_id, place_map)
+                if place_details:
+                    place_info = place_details.get('title') or place_details.get('name', '')
             
             # Получаем даты проведения (dates)
             # Фильтруем только актуальные будущие даты
@@ -333,7 +683,8 @@ class KudaGoAPI:
             daterange = event.get('daterange', {})
             
             # Получаем текущую дату для фильтрации
-            current_date = datetime.now(tz.utc).date()
+            if current_date is None:
+                current_date = datetime.now(tz.utc).date()
             
             # Сначала проверяем daterange (если есть)
             if daterange and isinstance(daterange, dict):
@@ -343,20 +694,17 @@ class KudaGoAPI:
                 end_time = daterange.get('end_time', '')
                 
                 if start_date_str:
-                    try:
-                        # Парсим дату и проверяем, что она в будущем
-                        start_date_obj = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-                        if start_date_obj >= current_date:
-                            date_str = start_date_str
-                            if start_time:
-                                date_str += f" {start_time}"
-                            if end_date_str and end_date_str != start_date_str:
-                                date_str += f" - {end_date_str}"
-                                if end_time:
-                                    date_str += f" {end_time}"
-                            dates_info = date_str
-                    except ValueError:
-                        pass
+                    # Парсим дату и проверяем, что она в будущем
+                    start_date_obj = _parse_iso_date(start_date_str)
+                    if start_date_obj and start_date_obj >= current_date:
+                        date_str = start_date_str
+                        if start_time:
+                            date_str += f" {start_time}"
+                        if end_date_str and end_date_str != start_date_str:
+                            date_str += f" - {end_date_str}"
+                            if end_time:
+                                date_str += f" {end_time}"
+                        dates_info = date_str
             
             # Если dates - это список словарей
             elif dates and isinstance(dates, list):
@@ -370,44 +718,36 @@ class KudaGoAPI:
                         end_time = date_item.get('end_time', '')
                         
                         if start_date_str:
-                            try:
-                                # Парсим дату и проверяем, что она в будущем
-                                start_date_obj = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-                                if start_date_obj >= current_date:
-                                    date_str = start_date_str
-                                    if start_time:
-                                        date_str += f" {start_time}"
-                                    if end_date_str and end_date_str != start_date_str:
-                                        date_str += f" - {end_date_str}"
-                                        if end_time:
-                                            date_str += f" {end_time}"
-                                    date_strings.append(date_str)
-                            except ValueError:
-                                # Если не удалось распарсить дату, пробуем timestamp
-                                pass
+                            # Парсим дату и проверяем, что она в будущем
+                            start_date_obj = _parse_iso_date(start_date_str)
+                            if start_date_obj and start_date_obj >= current_date:
+                                date_str = start_date_str
+                                if start_time:
+                                    date_str += f" {start_time}"
+                                if end_date_str and end_date_str != start_date_str:
+                                    date_str += f" - {end_date_str}"
+                                    if end_time:
+                                        date_str += f" {end_time}"
+                                date_strings.append(date_str)
                         
                         # Fallback: Unix timestamp (start/end) - только если нет start_date
                         if not start_date_str:
                             start_ts = date_item.get('start')
                             end_ts = date_item.get('end')
                             
-                            if start_ts:
-                                try:
-                                    # Конвертируем Unix timestamp в дату
-                                    if 0 < start_ts < 2147483647:  # Валидный диапазон Unix timestamp
-                                        start_dt = datetime.fromtimestamp(start_ts, tz=tz.utc)
-                                        # Проверяем, что дата в будущем
-                                        if start_dt.date() >= current_date:
-                                            date_str = start_dt.strftime('%Y-%m-%d %H:%M:%S')
-                                            
-                                            if end_ts and end_ts != start_ts and 0 < end_ts < 2147483647:
-                                                end_dt = datetime.fromtimestamp(end_ts, tz=tz.utc)
-                                                date_str += f" - {end_dt.strftime('%Y-%m-%d %H:%M:%S')}"
-                                            
-                                            date_strings.append(date_str)
-                                except (ValueError, OSError) as e:
-                                    logger.debug(f"Ошибка при конвертации timestamp {start_ts}: {e}")
-                                    continue
+                            # Конвертируем Unix timestamp в дату; проверка диапазона
+                            # гарантирует, что fromtimestamp не выбросит исключение
+                            if start_ts and 0 < start_ts < MAX_TIMESTAMP:
+                                start_dt = datetime.fromtimestamp(start_ts, tz=tz.utc)
+                                # Проверяем, что дата в будущем
+                                if start_dt.date() >= current_date:
+                                    date_str = start_dt.strftime('%Y-%m-%d %H:%M:%S')
+                                    
+                                    if end_ts and end_ts != start_ts and 0 < end_ts < MAX_TIMESTAMP:
+                                        end_dt = datetime.fromtimestamp(end_ts, tz=tz.utc)
+                                        date_str += f" - {end_dt.strftime('%Y-%m-%d %H:%M:%S')}"
+                                    
+                                    date_strings.append(date_str)
                 
                 dates_info = '; '.join(date_strings) if date_strings else ''
             
@@ -433,6 +773,20 @@ class KudaGoAPI:
             logger.debug(f"Структура события: {event}")
             return None
     
+    def _request_results(self, url: str, params: Dict) -> List[Dict]:
+        """Выполняет GET-запрос к списочному методу API и возвращает results."""
+        response = self.session.get(url, params=params)
+        response.raise_for_status()
+        return self._json(response).get('results', [])
+    
+    @staticmethod
+    def _title_matches(event: Dict, query_lower: str) -> bool:
+        """Проверяет, входит ли запрос в title или short_title события."""
+        return (
+            query_lower in (event.get('title') or '').lower()
+            or query_lower in (event.get('short_title') or '').lower()
+        )
+    
     def search_events(self, query: str, location: Optional[str] = None, categories: Optional[str] = None, limit: int = 10) -> List[Dict]:
         """
         Ищет события по текстовому запросу.
@@ -464,42 +818,56 @@ class KudaGoAPI:
             if categories:
                 params['categories'] = str(categories)
             
-            # Поиск по тексту - получаем все события и фильтруем на клиенте
-            # KudaGo API не всегда поддерживает текстовый поиск напрямую
+            # Получаем текущую дату для фильтрации; округляем до SEARCH_CACHE_TTL,
+            # чтобы повторные поиски в этом интервале попадали в кэш
+            current_timestamp = int(datetime.now(tz.utc).timestamp())
+            actual_since = current_timestamp - current_timestamp % SEARCH_CACHE_TTL
+            params['actual_since'] = actual_since
             
-            # Получаем текущую дату для фильтрации
-            from datetime import timezone
-            current_timestamp = int(datetime.now(timezone.utc).timestamp())
-            params['actual_since'] = current_timestamp
+            if not query:
+                return self._request_results(url, params)[:limit]
             
-            response = self.session.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
+            query_lower = query.lower()
             
-            events = data.get('results', [])
+            # Сначала просим сервер отфильтровать события по тексту (q).
+            # Результат все равно проверяем по title/short_title: KudaGo
+            # не всегда поддерживает текстовый поиск напрямую
+            events = self._request_results(url, {**params, 'q': query})
+            found = [event for event in events if self._title_matches(event, query_lower)]
+            if found:
+                return found[:limit]
             
-            # Фильтруем по тексту запроса (ищем в title и short_title)
-            if query:
-                query_lower = query.lower()
-                filtered_events = []
-                for event in events:
-                    title = (event.get('title') or '').lower()
-                    short_title = (event.get('short_title') or '').lower()
-                    if query_lower in title or query_lower in short_title:
-                        filtered_events.append(event)
-                events = filtered_events
+            # Иначе фильтруем на клиенте страницу событий без q. Названия
+            # приводятся к нижнему регистру один раз и кэшируются вместе с событиями
+            cache_key = (location, categories, params['page_size'], actual_since)
+            events_lc = self._search_cache.get(cache_key)
+            if events_lc is None:
+                events_lc = [
+                    (event, (event.get('title') or '').lower(), (event.get('short_title') or '').lower())
+                    for event in self._request_results(url, params)
+                ]
+                # Записи прошлых интервалов больше не понадобятся
+                self._search_cache = {
+                    key: value for key, value in self._search_cache.items() if key[3] == actual_since
+                }
+                self._search_cache[cache_key] = events_lc
             
-            return events[:limit]
+            return [
+                event for event, title_lc, short_lc in events_lc
+                if query_lower in title_lc or query_lower in short_lc
+            ][:limit]
         except Exception as e:
             logger.error(f"Ошибка при поиске событий: {e}")
             return []
     
-    def get_event_schedule(self, event_id: int) -> List[Dict]:
+    def get_event_schedule(self, event_id: int, current_date: Optional[date] = None) -> List[Dict]:
         """
         Получает расписание (даты и время) для события.
         
         Args:
             event_id: ID события
+            current_date: Текущая дата (UTC); при запросе расписаний многих событий
+                передайте ее, чтобы не вычислять заново
         
         Returns:
             Список словарей с датами и временем показа
@@ -512,69 +880,385 @@ class KudaGoAPI:
                 expand='dates'
             )
             
-            if not event:
-                return []
-            
-            dates = event.get('dates', [])
-            if not dates:
-                return []
-            
-            # Фильтруем только будущие даты и форматируем
+            return self._build_schedule(event, current_date)
+        except Exception as e:
+            logger.error(f"Ошибка при получении расписания для события {event_id}: {e}")
+            return []
+    
+    def _build_schedule(self, event: Optional[Dict], current_date: Optional[date] = None) -> List[Dict]:
+        """
+        Формирует расписание из деталей события.
+        
+        Args:
+            event: Детали события с развернутыми датами (или None)
+            current_date: Текущая дата (UTC); None - вычислить
+        
+        Returns:
+            Список словарей с будущими датами и временем показа, по возрастанию
+        """
+        if not event:
+            return []
+        
+        dates = event.get('dates', [])
+        if not dates:
+            return []
+        
+        # Фильтруем только будущие даты и форматируем
+        if current_date is None:
             current_date = datetime.now(tz.utc).date()
-            schedule = []
-            
-            for date_item in dates:
-                if isinstance(date_item, dict):
-                    start_date_str = date_item.get('start_date', '')
-                    start_time = date_item.get('start_time', '')
-                    start_ts = date_item.get('start')
-                    
-                    # Проверяем, что дата в будущем
-                    is_future = False
-                    datetime_obj = None
-                    
-                    if start_date_str:
-                        try:
-                            date_obj = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-                            if date_obj >= current_date:
-                                is_future = True
-                                # Формируем datetime объект
-                                if start_time:
-                                    datetime_str = f"{start_date_str} {start_time}"
-                                    datetime_obj = datetime.strptime(datetime_str, '%Y-%m-%d %H:%M:%S')
-                                else:
-                                    datetime_obj = datetime.strptime(start_date_str, '%Y-%m-%d')
-                        except ValueError:
-                            pass
-                    elif start_ts:
-                        try:
-                            if 0 < start_ts < 2147483647:
-                                dt = datetime.fromtimestamp(start_ts, tz=tz.utc)
-                                if dt.date() >= current_date:
-                                    is_future = True
-                                    datetime_obj = dt
-                        except (ValueError, OSError):
-                            pass
-                    
-                    if is_future and datetime_obj:
-                        # Формируем читаемую метку
+        # Пары (ключ сортировки, элемент расписания)
+        keyed_schedule = []
+        
+        for date_item in dates:
+            if isinstance(date_item, dict):
+                start_date_str = date_item.get('start_date', '')
+                start_time = date_item.get('start_time', '')
+                start_ts = date_item.get('start')
+                
+                # Проверяем, что дата в будущем
+                is_future = False
+                datetime_obj = None
+                
+                if start_date_str:
+                    date_obj = _parse_iso_date(start_date_str)
+                    if date_obj and date_obj >= current_date:
+                        is_future = True
+                        # Формируем datetime объект
                         if start_time:
-                            label = datetime_obj.strftime('%d %B %Y %H:%M')
+                            time_obj = _parse_iso_time(start_time)
+                            if time_obj:
+                                datetime_obj = datetime.combine(date_obj, time_obj)
                         else:
-                            label = datetime_obj.strftime('%d %B %Y')
-                        
-                        schedule.append({
-                            'datetime': datetime_obj,
-                            'label': label,
-                            'start_date': start_date_str or datetime_obj.strftime('%Y-%m-%d'),
-                            'start_time': start_time or datetime_obj.strftime('%H:%M:%S'),
-                            'raw': date_item
-                        })
+                            datetime_obj = datetime.combine(date_obj, dt_time())
+                elif start_ts:
+                    if 0 < start_ts < MAX_TIMESTAMP:
+                        dt = datetime.fromtimestamp(start_ts, tz=tz.utc)
+                        if dt.date() >= current_date:
+                            is_future = True
+                            datetime_obj = dt
+                
+                if is_future and datetime_obj:
+                    # Формируем читаемую метку (месяц по-русски независимо от локали сервера)
+                    label = (
+                        f"{datetime_obj.day:02d} {RU_MONTHS[datetime_obj.month - 1]} {datetime_obj.year}"
+                    )
+                    if start_time:
+                        label += f" {datetime_obj.hour:02d}:{datetime_obj.minute:02d}"
+                    
+                    # Кортеж целых сравнивается быстрее datetime и не падает на смеси
+                    # naive (start_date) и aware (timestamp в UTC) значений
+                    sort_key = (
+                        datetime_obj.year, datetime_obj.month, datetime_obj.day,
+                        datetime_obj.hour, datetime_obj.minute, datetime_obj.second
+                    )
+                    keyed_schedule.append((sort_key, {
+                        'datetime': datetime_obj,
+                        'label': label,
+                        'start_date': start_date_str or datetime_obj.strftime('%Y-%m-%d'),
+                        'start_time': start_time or datetime_obj.strftime('%H:%M:%S'),
+                        'raw': date_item
+                    }))
+        
+        # Сортируем по дате
+        keyed_schedule.sort(key=itemgetter(0))
+        return [item for _, item in keyed_schedule]
+    
+    # --- Асинхронный интерфейс (httpx.AsyncClient) ---
+    
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Возвращает асинхронный HTTP-клиент, создавая его при первом обращении."""
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={'User-Agent': USER_AGENT},
+                timeout=ASYNC_HTTP_TIMEOUT,
+                # HTTP/2 мультиплексирует параллельные запросы в одном соединении;
+                # retries здесь повторяют только неудачные подключения
+                transport=httpx.AsyncHTTPTransport(http2=True, retries=HTTP_RETRY.total, limits=ASYNC_HTTP_LIMITS)
+            )
+            self._async_slots = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        return self._async_client
+    
+    async def _aget(self, path: str, params: Dict) -> httpx.Response:
+        """
+        Выполняет GET-запрос асинхронным клиентом с ограничением параллельности.
+        
+        Ответы со статусами из HTTP_RETRY.status_forcelist (429, 5xx) повторяются
+        до HTTP_RETRY.total раз с экспоненциальной паузой, как у синхронной сессии;
+        пауза выдерживается вне слота, чтобы не занимать его у других запросов.
+        """
+        client = self._get_async_client()
+        for attempt in range(HTTP_RETRY.total + 1):
+            async with self._async_slots:
+                response = await client.get(path, params=params)
+            if response.status_code not in HTTP_RETRY.status_forcelist or attempt == HTTP_RETRY.total:
+                return response
+            
+            delay = HTTP_RETRY.backoff_factor * (2 ** attempt)
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                delay = max(delay, min(float(retry_after), ASYNC_RETRY_AFTER_MAX))
+            logger.debug(f"Ответ {response.status_code} от {path}, повтор через {delay:.1f} с")
+            await asyncio.sleep(delay)
+        return response
+    
+    async def aclose(self) -> None:
+        """Закрывает асинхронный HTTP-клиент."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_slots = None
+    
+    async def get_events_async(
+        self,
+        location: Optional[str] = None,
+        categories: Optional[str] = None,
+        page_size: int = 100,
+        page: int = 1,
+        fields: Optional[str] = DEFAULT_EVENT_FIELDS,
+        actual_since: Optional[int] = None,
+        expand: Optional[str] = None
+    ) -> Dict:
+        """Асинхронная версия get_events."""
+        try:
+            return await self._fetch_events_async(
+                location, categories, page_size, page, fields, actual_since, expand
+            )
+        except Exception as e:
+            logger.error(f"Ошибка при получении событий: {e}")
+            if hasattr(e, 'response') and e.response is not None:
+                logger.error(f"Ответ сервера: {e.response.text}")
+            return {'count': 0, 'results': [], 'next': None, 'previous': None}
+    
+    async def _fetch_events_async(
+        self,
+        location: Optional[str],
+        categories: Optional[str],
+        page_size: int,
+        page: int,
+        fields: Optional[str],
+        actual_since: Optional[int],
+        expand: Optional[str]
+    ) -> Dict:
+        """
+        Загружает страницу событий, не скрывая ошибок.
+        
+        Raises:
+            httpx.HTTPError: Если страница не загрузилась и после повторов
+        """
+        params = self._events_params(location, categories, page_size, page, fields, actual_since, expand)
+        
+        logger.debug(f"Запрос к API: /events/ с параметрами: {params}")
+        response = await self._aget('/events/', params)
+        
+        # Если ошибка 400, пробуем без fields
+        if response.status_code == 400 and fields:
+            logger.debug("Ошибка 400, пробуем без fields")
+            params.pop('fields', None)
+            response = await self._aget('/events/', params)
+        
+        response.raise_for_status()
+        return self._json(response)
+    
+    async def get_all_events_async(
+        self,
+        location: Optional[str] = None,
+        categories: Optional[str] = None,
+        fields: Optional[str] = DEFAULT_EVENT_FIELDS,
+        max_pages: Optional[int] = None,
+        actual_since: Optional[int] = None,
+        expand: Optional[str] = None
+    ) -> List[Dict]:
+        """Асинхронная версия get_all_events: страницы 2..N загружаются параллельно."""
+        return [event async for event in self.iter_all_events_async(
+            location=location,
+            categories=categories,
+            fields=fields,
+            max_pages=max_pages,
+            actual_since=actual_since,
+            expand=expand
+        )]
+    
+    async def iter_all_events_async(
+        self,
+        location: Optional[str] = None,
+        categories: Optional[str] = None,
+        fields: Optional[str] = DEFAULT_EVENT_FIELDS,
+        max_pages: Optional[int] = None,
+        actual_since: Optional[int] = None,
+        expand: Optional[str] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Асинхронная версия iter_all_events: события отдаются постранично
+        по мере получения, порядок страниц сохраняется.
+        
+        Yields:
+            Словари событий
+        """
+        async for page in self.iter_event_pages_async(
+            location=location,
+            categories=categories,
+            fields=fields,
+            max_pages=max_pages,
+            actual_since=actual_since,
+            expand=expand
+        ):
+            for event in page:
+                yield event
+    
+    async def iter_event_pages_async(
+        self,
+        location: Optional[str] = None,
+        categories: Optional[str] = None,
+        fields: Optional[str] = DEFAULT_EVENT_FIELDS,
+        max_pages: Optional[int] = None,
+        actual_since: Optional[int] = None,
+        expand: Optional[str] = None
+    ) -> AsyncIterator[List[Dict]]:
+        """
+        Перебирает страницы событий (аргументы те же, что у get_all_events).
+        
+        Страницы 2..N запрашиваются параллельно (не более MAX_CONCURRENT_REQUESTS
+        одновременно), пока потребитель обрабатывает уже полученные; порядок
+        страниц сохраняется.
+        
+        Yields:
+            Списки событий очередной страницы
+        
+        Raises:
+            httpx.HTTPError: Если какая-либо страница не загрузилась: каталог
+                с пропущенными страницами хуже, чем отсутствие обновления
+        """
+        query = dict(
+            location=location,
+            categories=categories,
+            page_size=PAGE_SIZE,
+            fields=fields,
+            actual_since=actual_since,
+            expand=expand
+        )
+        
+        # Первая страница сообщает общее количество событий
+        data = await self._fetch_events_async(page=1, **query)
+        
+        first_page = data.get('results', [])
+        if not first_page or not data.get('next'):
+            if first_page:
+                yield first_page
+            return
+        
+        # Число страниц считаем по фактическому размеру первой страницы
+        # (сервер может ограничить page_size сильнее, чем запрошено)
+        count = data.get('count', 0)
+        total_pages = math.ceil(count / len(first_page))
+        if max_pages:
+            total_pages = min(total_pages, max_pages)
+        logger.debug(f"Всего событий: {count}, страниц: {total_pages}")
+        
+        # Остальные страницы запрашиваются сразу, еще до обработки первой
+        tasks = [
+            asyncio.ensure_future(self._fetch_events_async(page=page, **query))
+            for page in range(2, total_pages + 1)
+        ]
+        try:
+            yield first_page
+            for task in tasks:
+                page_data = await task
+                yield page_data.get('results', [])
+        finally:
+            # Если перебор прекращен досрочно или страница не загрузилась,
+            # оставшиеся страницы не загружаем, а ошибки уже завершенных забираем
+            for task in tasks:
+                if task.done() and not task.cancelled():
+                    task.exception()
+                task.cancel()
+    
+    async def get_event_details_async(
+        self,
+        event_id: int,
+        fields: Optional[str] = None,
+        expand: Optional[str] = None
+    ) -> Optional[Dict]:
+        """Асинхронная версия get_event_details (кэш общий с синхронной версией)."""
+        cache_key = (event_id, fields, expand)
+        hit, event = self._cache_lookup(self._event_cache, cache_key, EVENT_DETAILS_CACHE_TTL)
+        if hit:
+            return event
+        
+        event = None
+        try:
+            params = {'lang': 'ru'}
+            
+            if fields:
+                params['fields'] = fields
+            
+            if expand:
+                params['expand'] = expand
+            
+            response = await self._aget(f"/events/{event_id}/", params)
+            response.raise_for_status()
+            event = self._json(response)
+        except Exception as e:
+            logger.debug(f"Ошибка при получении деталей события {event_id}: {e}")
+        
+        self._event_cache[cache_key] = (time.monotonic(), event)
+        return event
+    
+    async def get_place_details_async(self, place_id: int) -> Optional[Dict]:
+        """Асинхронная версия get_place_details (кэш общий с синхронной версией)."""
+        hit, place = self._cache_lookup(self._place_cache, place_id, REFERENCE_CACHE_TTL)
+        if hit:
+            return place
+        
+        place = None
+        try:
+            response = await self._aget(f"/places/{place_id}/", {'lang': 'ru', 'fields': 'id,title,name'})
+            response.raise_for_status()
+            place = self._json(response)
+        except Exception as e:
+            logger.debug(f"Не удалось получить детали места {place_id}: {e}")
+        
+        self._place_cache[place_id] = (time.monotonic(), place)
+        return place
+    
+    async def extract_show_info_batch_async(self, events: List[Dict], current_date: Optional[date] = None) -> List[Dict]:
+        """
+        Асинхронная версия extract_show_info_batch: детали мест, не развернутых
+        в событиях, запрашиваются параллельно через asyncio.gather.
+        
+        Args:
+            events: Список словарей с данными событий
+            current_date: Текущая дата (UTC); None - вычислить
+        
+        Returns:
+            Список словарей с информацией о спектаклях
+        """
+        # dict сохраняет порядок первого появления каждого ID
+        events = list({event.get('id'): event for event in events}.values())
+        
+        # Разбор события - быстрая работа на процессоре; ждать приходится только
+        # сети, поэтому параллельными делаем запросы мест, а не сам разбор
+        needed_ids = list({pid for pid in map(self._place_id_to_fetch, events) if pid})
+        places = await asyncio.gather(*map(self.get_place_details_async, needed_ids))
+        place_map = dict(zip(needed_ids, places))
+        if current_date is None:
+            current_date = datetime.now(tz.utc).date()
+        
+        # filter(None, ...) отбрасывает события, которые не удалось разобрать, без цикла на Python
+        return list(filter(None, (
+            self._extract_show_info_with_map(event, place_map, current_date) for event in events
+        )))
+    
+    async def get_event_schedule_async(self, event_id: int, current_date: Optional[date] = None) -> List[Dict]:
+        """Асинхронная версия get_event_schedule."""
+        try:
+            event = await self.get_event_details_async(
+                event_id,
+                fields='id,title,dates',
+                expand='dates'
+            )
             
-            # Сортируем по дате
-            schedule.sort(key=lambda x: x['datetime'])
-            return schedule
+            return self._build_schedule(event, current_date)
         except Exception as e:
             logger.error(f"Ошибка при получении расписания для события {event_id}: {e}")
             return []
-
@@ -1,16 +1,22 @@
 """Главный модуль Telegram-бота для управления спектаклями."""
+import asyncio
 import logging
 import os
-import subprocess
+import re
 import csv
-import zoneinfo
+import io
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
-from typing import Optional
+from typing import Awaitable, Deque, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
 from datetime import datetime, timedelta, timezone
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, BotCommand
 from telegram.ext import (
     Application,
+    BaseUpdateProcessor,
     CommandHandler,
     MessageHandler,
     CallbackQueryHandler,
@@ -18,11 +24,19 @@ from telegram.ext import (
     ContextTypes,
     filters,
 )
-
-import dateparser
-from apscheduler.schedulers.background import BackgroundScheduler
-
-from app.config import BOT_TOKEN, EXPORT_DIR, PROXY_URL
+from telegram.request import HTTPXRequest
+
+from dateparser.date import DateDataParser
+
+from app.config import (
+    BOT_TOKEN,
+    EXPORT_DIR,
+    PROXY_URL,
+    WEBHOOK_URL,
+    WEBHOOK_LISTEN,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+)
 from app.db import (
     init_db,
     add_user,
@@ -32,10 +46,16 @@ from app.db import (
     delete_show,
     update_show,
     get_pending_notifications,
-    mark_notification_sent,
+    mark_notifications_sent,
     get_theatres_stats,
 )
-from app.export_utils import generate_txt
+from app.export_utils import (
+    DB_DATE_FORMAT,
+    DB_DATETIME_FORMAT,
+    MOSCOW_TZ,
+    build_txt_export_async,
+    format_datetime_for_user,
+)
 
 # Настройка логирования
 logging.basicConfig(
@@ -48,8 +68,20 @@ logger = logging.getLogger(__name__)
 logging.getLogger("httpx").setLevel(logging.WARNING)
 logging.getLogger("telegram").setLevel(logging.WARNING)
 
-# Часовой пояс пользователя (Москва UTC+3)
-MOSCOW_TZ = zoneinfo.ZoneInfo("Europe/Moscow")
+# Настройки dateparser для разбора пользовательского ввода даты
+_DATEPARSER_SETTINGS = {
+    'TIMEZONE': 'Europe/Moscow',
+    'RETURN_AS_TIMEZONE_AWARE': True,  # Важно: возвращаем с таймзоной
+    'DATE_ORDER': 'DMY',
+    'PREFER_DAY_OF_MONTH': 'first',
+}
+
+# Парсер dateparser создается один раз: загрузка языков и настроек не повторяется на каждый вызов
+_DATE_PARSER = DateDataParser(languages=['ru', 'en'], settings=_DATEPARSER_SETTINGS)
+
+# Основной формат ввода даты из подсказок бота: ДД.ММ.ГГГГ или ДД.ММ.ГГГГ ЧЧ:ММ.
+# Разбирается напрямую, dateparser вызывается только для остальных форматов
+_DATE_RE = re.compile(r'^\s*(\d{1,2})\.(\d{1,2})\.(\d{4})(?:\s+(\d{1,2}):(\d{2}))?\s*$')
 
 # Константы для напоминаний
 REMINDER_1_DAY = "1 день"
@@ -57,6 +89,63 @@ REMINDER_6_HOURS = "6 часов"
 REMINDER_3_HOURS = "3 часа"
 REMINDER_1_HOUR = "1 час"
 
+# Интервал между напоминанием и началом спектакля для каждого варианта
+_REMINDER_DELTAS = {
+    REMINDER_1_DAY: timedelta(days=1),
+    REMINDER_6_HOURS: timedelta(hours=6),
+    REMINDER_3_HOURS: timedelta(hours=3),
+    REMINDER_1_HOUR: timedelta(hours=1),
+}
+
+# Варианты напоминания в порядке отображения в меню
+REMINDER_OPTIONS = (REMINDER_1_DAY, REMINDER_6_HOURS, REMINDER_3_HOURS, REMINDER_1_HOUR)
+
+# Постоянные клавиатуры создаются один раз при импорте и переиспользуются во всех ответах
+START_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("✅ Использовать текущие данные", callback_data="use_current_csv")],
+    [InlineKeyboardButton("🔄 Обновить данные (до 5 минут)", callback_data="update_csv")],
+])
+
+SEARCH_MODE_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔍 Поиск по названию спектакля", callback_data="search_mode:title")],
+    [InlineKeyboardButton("🏛️ Поиск по названию театра", callback_data="search_mode:theatre")],
+    [InlineKeyboardButton("✍️ Ручной ввод", callback_data="search_mode:manual")],
+])
+
+CSV_SINGLE_DATE_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("✅ Использовать эту дату", callback_data="csv_date_confirm")],
+    [InlineKeyboardButton("✍️ Ввести другую дату", callback_data="csv_date_manual")],
+])
+
+REMINDER_KEYBOARD = InlineKeyboardMarkup(
+    [[InlineKeyboardButton(f"⏰ {label} до события", callback_data=f"reminder:{label}")] for label in REMINDER_OPTIONS]
+    + [[InlineKeyboardButton("🚫 Без напоминания", callback_data="reminder:none")]]
+)
+
+EDIT_FIELD_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📝 Изменить название", callback_data="edit_field:show_name")],
+    [InlineKeyboardButton("🏛️ Изменить театр", callback_data="edit_field:theatre")],
+    [InlineKeyboardButton("📅 Изменить дату", callback_data="edit_field:show_date")],
+    [InlineKeyboardButton("⏰ Изменить напоминание", callback_data="edit_field:reminder")],
+    [InlineKeyboardButton("❌ Отмена", callback_data="edit_cancel:")],
+])
+
+EDIT_REMINDER_KEYBOARD = InlineKeyboardMarkup(
+    [[InlineKeyboardButton(f"⏰ {label} до события", callback_data=f"edit_reminder:{label}")] for label in REMINDER_OPTIONS]
+    + [
+        [InlineKeyboardButton("🗑️ Удалить напоминание", callback_data="edit_reminder:delete")],
+        [InlineKeyboardButton("❌ Отмена", callback_data="edit_cancel:")],
+    ]
+)
+
+# Подписи кнопок под спектаклем в /my_shows (меняется только callback_data)
+SHOW_EDIT_LABEL = "✏️ Редактировать"
+SHOW_DELETE_LABEL = "🗑️ Удалить"
+SHOW_EXPORT_LABEL = "📄 Экспортировать"
+
+# Размер кэша клавиатур спектаклей (клавиатура неизменяема и зависит только от ID)
+SHOW_MARKUP_CACHE_SIZE = 1024
+
 # Состояния для ConversationHandler
 SEARCH_MODE, SEARCH_QUERY, MANUAL_SHOW_NAME, MANUAL_THEATRE, MANUAL_SHOW_DATE, SELECT_REMINDER = range(6)
 EDIT_SHOW_NAME, EDIT_SHOW_THEATRE, EDIT_SHOW_DATE, EDIT_REMINDER = range(6, 10)
@@ -64,48 +153,157 @@ EDIT_SHOW_NAME, EDIT_SHOW_THEATRE, EDIT_SHOW_DATE, EDIT_REMINDER = range(6, 10)
 # Путь к CSV с каталогом спектаклей
 CSV_PATH = Path("data/shows_catalog.csv")
 
+# Длина n-граммы для поискового индекса по каталогу
+TRIGRAM_SIZE = 3
+
+# Триграммный индекс: триграмма -> номера строк каталога, в которых она встречается
+TrigramIndex = Dict[str, Set[int]]
+
+# Размер буфера чтения каталога: меньше системных вызовов read() на больших файлах
+CSV_READ_BUFFER_SIZE = 65536
+
+# Колонки CSV, которые бот читает из каталога (в порядке полей CatalogShow)
+CATALOG_COLUMNS = ('id', 'short_title', 'place', 'dates')
+
+
+class CatalogShow(NamedTuple):
+    """Спектакль из каталога: только нужные боту колонки и разобранное расписание."""
+    
+    id: str
+    short_title: str
+    place: str
+    schedule: List[dict]
+
+
+class CsvCatalog(NamedTuple):
+    """Разобранный каталог спектаклей с поисковыми индексами."""
+    
+    rows: List[CatalogShow]
+    by_id: Dict[str, CatalogShow]
+    titles_lower: List[str]
+    places_lower: List[str]
+    titles_index: TrigramIndex
+    places_index: TrigramIndex
+    mtime_ns: int
+
+
+# Кэш разобранного каталога: (st_mtime_ns файла, каталог).
+# Файл меняется только скриптом обновления, поэтому перечитываем его лишь при смене mtime
+_CSV_CACHE: Optional[Tuple[int, CsvCatalog]] = None
+
+# Частота отправки сообщений для всего бота: списки /my_shows и рассылка напоминаний
+# (лимит Telegram - около 30 сообщений в секунду на бота, оставляем запас)
+MESSAGES_PER_SECOND = 25
+
+
+class SendRateLimiter:
+    """
+    Ограничивает частоту отправок: слоты раздаются равномерно, не чаще rate в секунду.
+    
+    В отличие от семафора, ограничивает именно число сообщений в секунду,
+    а не число одновременно выполняющихся запросов.
+    """
+    
+    def __init__(self, rate: float):
+        self._interval = 1 / rate
+        self._next_slot = 0.0
+    
+    async def wait(self) -> None:
+        """Ждет следующего свободного слота отправки."""
+        now = asyncio.get_running_loop().time()
+        # Слот резервируется до await, поэтому одновременные вызовы получают разные слоты
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self._interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+# Общий для бота ограничитель частоты отправки сообщений
+MESSAGE_RATE_LIMITER = SendRateLimiter(MESSAGES_PER_SECOND)
+
+# Максимум одновременно обрабатываемых апдейтов (разных пользователей)
+MAX_CONCURRENT_UPDATES = 256
+
+# Свежесть каталога (в секундах) при обновлении по кнопке: пользователь просит новые данные,
+# но если каталог только что обновили по запросу другого пользователя, повторно не выгружаем
+CSV_REFRESH_TTL = 60
+
+# Блокировка обновления каталога: при параллельной обработке апдейтов скрипт
+# обновления не должен запускаться несколькими пользователями одновременно
+CSV_UPDATE_LOCK = asyncio.Lock()
+
+# Блокировка разбора каталога: после обновления файла его разбирает один поток
+CSV_LOAD_LOCK = asyncio.Lock()
+
+# Параметры HTTP-клиента для запросов к Telegram: большой пул соединений и HTTP/2,
+# чтобы параллельные send_message/edit_message_text не ждали свободного соединения
+HTTP_REQUEST_SETTINGS = {
+    'connection_pool_size': 256,
+    'http_version': '2',
+    'read_timeout': 20,
+    'write_timeout': 20,
+    'pool_timeout': 5,
+}
+
 
 def parse_user_datetime(date_text: str) -> Optional[datetime]:
     """
     Парсит строку даты/времени, введенную пользователем, как московское время
     и возвращает datetime объект в UTC.
     """
-    parsed_date = dateparser.parse(
-        date_text,
-        languages=['ru', 'en'],
-        settings={
-            'TIMEZONE': 'Europe/Moscow',
-            'RETURN_AS_TIMEZONE_AWARE': True,  # Важно: возвращаем с таймзоной
-            'DATE_ORDER': 'DMY',
-            'PREFER_DAY_OF_MONTH': 'first',
-        }
-    )
+    match = _DATE_RE.match(date_text)
+    if match:
+        day, month, year, hour, minute = match.groups()
+        try:
+            parsed_date = datetime(
+                int(year), int(month), int(day),
+                int(hour or 0), int(minute or 0),
+                tzinfo=MOSCOW_TZ
+            )
+            return parsed_date.astimezone(timezone.utc)
+        except ValueError:
+            # Несуществующая дата или время - оставляем решение за dateparser
+            pass
+    
+    parsed_date = _DATE_PARSER.get_date_data(date_text).date_obj
     if parsed_date:
         # Конвертируем в UTC
         return parsed_date.astimezone(timezone.utc)
     return None
 
 
-def format_datetime_for_user(dt_utc: datetime) -> str:
+def _parse_stored_dt(value: str) -> datetime:
     """
-    Форматирует datetime объект из UTC в московское время для отображения пользователю.
-    """
-    if dt_utc.tzinfo is None:
-        # Если datetime наивный, предполагаем, что это UTC (как хранится в БД)
-        dt_utc = dt_utc.replace(tzinfo=timezone.utc)
-    
-    dt_moscow = dt_utc.astimezone(MOSCOW_TZ)
+    Разбирает дату из БД (YYYY-MM-DD или YYYY-MM-DD HH:MM:SS) как UTC.
     
-    # Проверяем, есть ли время (не равно 00:00:00)
-    if dt_moscow.hour == 0 and dt_moscow.minute == 0 and dt_moscow.second == 0:
-        return dt_moscow.strftime('%d.%m.%Y')
-    return dt_moscow.strftime('%d.%m.%Y %H:%M')
+    Строки пишет сам бот в ISO-формате, поэтому datetime.fromisoformat
+    подходит и работает намного быстрее strptime.
+    """
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def _format_notify_at(value: int) -> str:
+    """Форматирует время напоминания из БД (секунды Unix epoch, UTC) для пользователя."""
+    return format_datetime_for_user(datetime.fromtimestamp(value, tz=timezone.utc))
+
+
+def _format_db_datetime(dt: datetime) -> str:
+    """Форматирует datetime для хранения в БД (YYYY-MM-DD HH:MM:SS) без разбора шаблона strftime."""
+    return f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d} {dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}"
+
+
+def _format_db_date(dt: datetime) -> str:
+    """Форматирует дату для хранения в БД (YYYY-MM-DD)."""
+    return f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d}"
 
 
 async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /start."""
     user = update.effective_user
-    add_user(user.id, user.username, user.first_name)
+    await asyncio.to_thread(add_user, user.id, user.username, user.first_name)
     
     # Проверяем наличие CSV файла
     csv_date_text = "данные отсутствуют"
@@ -114,18 +312,12 @@ async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         csv_date = datetime.fromtimestamp(csv_mtime, tz=MOSCOW_TZ)
         csv_date_text = csv_date.strftime('%d.%m.%Y %H:%M')
     
-    keyboard = [
-        [InlineKeyboardButton("✅ Использовать текущие данные", callback_data="use_current_csv")],
-        [InlineKeyboardButton("🔄 Обновить данные (до 5 минут)", callback_data="update_csv")],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
     await update.message.reply_text(
         f"👋 Привет, {user.first_name}!\n\n"
         f"Я помогу вам сохранять и управлять информацией о спектаклях.\n\n"
         f"📅 Последнее обновление каталога: {csv_date_text}\n\n"
         f"Выберите действие:",
-        reply_markup=reply_markup
+        reply_markup=START_KEYBOARD
     )
 
 
@@ -155,15 +347,24 @@ async def handle_csv_choice(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 )
                 return
             
-            # Запускаем скрипт синхронно (в реальном приложении лучше использовать async)
-            result = subprocess.run(
-                ["python", "-m", "scripts.fetch_shows"],
-                capture_output=True,
-                text=True,
-                timeout=600  # 10 минут максимум
-            )
+            # Запускаем скрипт асинхронно: цикл событий продолжает обслуживать других пользователей.
+            # Одновременно выполняется только одно обновление, остальные запросы ждут его завершения
+            async with CSV_UPDATE_LOCK:
+                proc = await asyncio.create_subprocess_exec(
+                    "python", "-m", "scripts.fetch_shows",
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    env={**os.environ, 'SHOWS_TTL': str(CSV_REFRESH_TTL)}
+                )
+                try:
+                    _, stderr = await asyncio.wait_for(proc.communicate(), timeout=600)  # 10 минут максимум
+                except asyncio.TimeoutError:
+                    proc.kill()
+                    await proc.wait()
+                    raise
+            stderr = stderr.decode('utf-8', errors='replace')
             
-            if result.returncode == 0:
+            if proc.returncode == 0:
                 # Получаем новую дату обновления
                 csv_mtime = CSV_PATH.stat().st_mtime
                 csv_date = datetime.fromtimestamp(csv_mtime, tz=MOSCOW_TZ)
@@ -175,13 +376,13 @@ async def handle_csv_choice(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     f"Используйте /add_show для добавления спектакля."
                 )
             else:
-                logger.error(f"Ошибка при обновлении CSV: {result.stderr}")
+                logger.error(f"Ошибка при обновлении CSV: {stderr}")
                 await query.edit_message_text(
                     "❌ Не удалось обновить данные. Используйте текущие данные.\n\n"
-                    f"Ошибка: {result.stderr[:200]}"
+                    f"Ошибка: {stderr[:200]}"
                 )
         
-        except subprocess.TimeoutExpired:
+        except asyncio.TimeoutError:
             await query.edit_message_text(
                 "❌ Превышено время ожидания обновления. Используйте текущие данные."
             )
@@ -215,16 +416,9 @@ async def cmd_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def cmd_add_show(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Начало процесса добавления спектакля: выбор режима поиска."""
-    keyboard = [
-        [InlineKeyboardButton("🔍 Поиск по названию спектакля", callback_data="search_mode:title")],
-        [InlineKeyboardButton("🏛️ Поиск по названию театра", callback_data="search_mode:theatre")],
-        [InlineKeyboardButton("✍️ Ручной ввод", callback_data="search_mode:manual")],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
     await update.message.reply_text(
         "Выберите способ добавления спектакля:",
-        reply_markup=reply_markup
+        reply_markup=SEARCH_MODE_KEYBOARD
     )
     return SEARCH_MODE
 
@@ -234,7 +428,7 @@ async def handle_search_mode_selection(update: Update, context: ContextTypes.DEF
     query = update.callback_query
     await query.answer()
     
-    mode = query.data.split(':')[1]
+    mode = query.data.partition(':')[2]
     context.user_data['search_mode'] = mode
     
     if mode == 'manual':
@@ -248,75 +442,253 @@ async def handle_search_mode_selection(update: Update, context: ContextTypes.DEF
         return SEARCH_QUERY
 
 
-def search_in_csv(query: str, mode: str = "title", limit: int = 10) -> list:
+def _trigrams(text: str) -> Set[str]:
+    """Возвращает множество триграмм строки."""
+    return {text[i:i + TRIGRAM_SIZE] for i in range(len(text) - TRIGRAM_SIZE + 1)}
+
+
+def _build_trigram_index(values: List[str]) -> TrigramIndex:
     """
-    Ищет спектакли в CSV файле по названию спектакля или театра.
+    Строит инвертированный триграммный индекс по списку строк.
     
     Args:
-        query: Поисковый запрос
-        mode: Режим поиска ("title" или "theatre")
-        limit: Максимальное количество результатов (None = без ограничения)
+        values: Строки в нижнем регистре
+    
+    Returns:
+        Словарь триграмма -> множество номеров строк
+    """
+    index: TrigramIndex = {}
+    for i, value in enumerate(values):
+        for gram in _trigrams(value):
+            index.setdefault(gram, set()).add(i)
+    return index
+
+
+def _parse_schedule(dates_str: str) -> List[dict]:
+    """
+    Разбирает колонку dates каталога в список сеансов.
+    
+    Args:
+        dates_str: Даты через точку с запятой в формате YYYY-MM-DD или YYYY-MM-DD HH:MM:SS
+    
+    Returns:
+        Список словарей {'datetime': время сеанса в UTC, 'label': исходная строка}
+    """
+    schedule = []
+    if not dates_str:
+        return schedule
+    
+    date_parts = [d.strip() for d in dates_str.split(';') if d.strip()]
+    for date_str in date_parts:
+        try:
+            if ' ' in date_str:
+                # Дата + время: парсим как московское время, конвертируем в UTC
+                datetime_obj = datetime.strptime(date_str.split(' - ')[0].strip(), DB_DATETIME_FORMAT)
+            else:
+                # Только дата: парсим как московское время (00:00), конвертируем в UTC
+                datetime_obj = datetime.strptime(date_str.split(' - ')[0].strip(), DB_DATE_FORMAT)
+            datetime_obj_utc = datetime_obj.replace(tzinfo=MOSCOW_TZ).astimezone(timezone.utc)
+            
+            schedule.append({
+                'datetime': datetime_obj_utc,
+                'label': date_str
+            })
+        except ValueError as e:
+            logger.error(f"Ошибка при парсинге даты '{date_str}': {e}")
+    
+    return schedule
+
+
+def load_csv_catalog() -> CsvCatalog:
+    """
+    Возвращает каталог спектаклей из CSV, перечитывая файл только при изменении.
     
     Returns:
-        Список найденных записей в формате dict
+        Каталог: строки, индекс по id, названия и театры в нижнем регистре
+        и их триграммные индексы
+    """
+    global _CSV_CACHE
+    
+    mtime_ns = CSV_PATH.stat().st_mtime_ns
+    if _CSV_CACHE is not None and _CSV_CACHE[0] == mtime_ns:
+        return _CSV_CACHE[1]
+    
+    rows = []
+    # newline='' - рекомендация модуля csv: переводы строк внутри полей разбирает сам reader
+    with open(CSV_PATH, 'r', encoding='utf-8', buffering=CSV_READ_BUFFER_SIZE, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        width = len(header)
+        columns = {name: i for i, name in enumerate(header)}
+        missing = [name for name in CATALOG_COLUMNS if name not in columns]
+        if missing:
+            logger.warning(f"В каталоге нет колонок {missing}, они считаются пустыми")
+        # Отсутствующая колонка читается из пустого поля, добавленного после колонок заголовка
+        get_fields = itemgetter(*(columns.get(name, width) for name in CATALOG_COLUMNS))
+        skipped = 0
+        for record in reader:
+            if len(record) < width:
+                # Пустая или оборванная (недописанная) строка
+                if record:
+                    skipped += 1
+                continue
+            if missing:
+                record[width:] = ('',)
+            show_id, short_title, place, dates = get_fields(record)
+            # Расписание разбираем один раз при загрузке, а не при каждом выборе спектакля
+            rows.append(CatalogShow(show_id, short_title, place, _parse_schedule(dates)))
+    if skipped:
+        logger.warning(f"Пропущено некорректных строк каталога: {skipped}")
+    titles_lower = [row.short_title.lower() for row in rows]
+    places_lower = [row.place.lower() for row in rows]
+    
+    catalog = CsvCatalog(
+        rows=rows,
+        by_id={row.id: row for row in rows},
+        titles_lower=titles_lower,
+        places_lower=places_lower,
+        titles_index=_build_trigram_index(titles_lower),
+        places_index=_build_trigram_index(places_lower),
+        mtime_ns=mtime_ns,
+    )
+    _CSV_CACHE = (mtime_ns, catalog)
+    logger.info(f"Каталог спектаклей загружен в память: {len(rows)} записей")
+    return catalog
+
+
+async def load_csv_catalog_async() -> Optional[CsvCatalog]:
     """
-    if not CSV_PATH.exists():
-        return []
+    Возвращает каталог спектаклей, не блокируя цикл событий.
     
-    results = []
-    query_lower = query.lower()
+    Разбор файла и построение индексов после обновления каталога выполняются
+    в отдельном потоке; пока mtime не менялся, каталог берется из кэша сразу.
     
+    Returns:
+        Каталог или None, если файла нет или его не удалось прочитать
+    """
     try:
-        with open(CSV_PATH, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if mode == "title":
-                    field_value = row.get('short_title', '').lower()
-                elif mode == "theatre":
-                    field_value = row.get('place', '').lower()
-                else:
-                    continue
-                
-                if query_lower in field_value:
-                    results.append(row)
-                    if limit and len(results) >= limit:
-                        break
+        mtime_ns = CSV_PATH.stat().st_mtime_ns
+        if _CSV_CACHE is not None and _CSV_CACHE[0] == mtime_ns:
+            return _CSV_CACHE[1]
+        # Одновременные запросы после обновления ждут одного разбора, а не запускают свои
+        async with CSV_LOAD_LOCK:
+            return await asyncio.to_thread(load_csv_catalog)
+    except FileNotFoundError:
+        return None
     except Exception as e:
         logger.error(f"Ошибка при чтении CSV: {e}")
+        return None
+
+
+def _iter_matches(catalog: Optional[CsvCatalog], query_lower: str, mode: str) -> Iterator[CatalogShow]:
+    """
+    Лениво перебирает спектакли каталога, подходящие под поисковый запрос.
+    
+    Args:
+        catalog: Каталог спектаклей (None - каталог недоступен)
+        query_lower: Поисковый запрос в нижнем регистре
+        mode: Режим поиска ("title" или "theatre")
+    
+    Returns:
+        Итератор по найденным спектаклям (в порядке каталога)
+    """
+    if catalog is None:
+        return
+    
+    rows = catalog.rows
+    if mode == "title":
+        field_values, index = catalog.titles_lower, catalog.titles_index
+    elif mode == "theatre":
+        field_values, index = catalog.places_lower, catalog.places_index
+    else:
+        return
+    
+    if len(query_lower) >= TRIGRAM_SIZE:
+        # Кандидаты - пересечение списков строк по всем триграммам запроса
+        # (начиная с самого короткого); подстрочная проверка отсекает ложные совпадения
+        postings = sorted((index.get(gram, set()) for gram in _trigrams(query_lower)), key=len)
+        candidates = sorted(postings[0].intersection(*postings[1:]))
+    else:
+        # Для коротких запросов индекс неприменим - просматриваем все строки
+        candidates = range(len(field_values))
+    
+    # Проход по плоскому списку строк без обращений к dict
+    for i in candidates:
+        if query_lower in field_values[i]:
+            yield rows[i]
+
+
+async def search_in_csv(query: str, mode: str = "title", limit: int = 10) -> list:
+    """
+    Ищет спектакли в CSV файле по названию спектакля или театра.
     
-    return results
+    Args:
+        query: Поисковый запрос
+        mode: Режим поиска ("title" или "theatre")
+        limit: Максимальное количество результатов (None = без ограничения)
+    
+    Returns:
+        Список найденных спектаклей (CatalogShow)
+    """
+    # islice прерывает поиск, как только набрано limit записей
+    catalog = await load_csv_catalog_async()
+    return list(islice(_iter_matches(catalog, query.lower(), mode), limit or None))
+
+
+def _count_matches(catalog: Optional[CsvCatalog], query_lower: str, mode: str) -> int:
+    """Считает спектакли каталога, подходящие под запрос, не собирая их в список."""
+    return sum(1 for _ in _iter_matches(catalog, query_lower, mode))
+
+
+async def count_csv_matches(query: str, mode: str = "title") -> int:
+    """Возвращает количество спектаклей, подходящих под запрос, не собирая их в список."""
+    catalog = await load_csv_catalog_async()
+    return _count_matches(catalog, query.lower(), mode)
 
 
 async def send_csv_results_page(
     update: Update,
     context: ContextTypes.DEFAULT_TYPE,
-    results: list,
     page: int = 0,
     is_edit: bool = False
 ):
     """
     Отправляет или редактирует сообщение со страницей результатов поиска (пагинация по 10).
     
+    Результаты не хранятся в user_data: страница заново выбирается из каталога в памяти
+    по сохраненному запросу, так что на пользователя приходится O(page_size) памяти.
+    Если каталог обновился после поиска, число совпадений пересчитывается.
+    
     Args:
         update: Update объект
         context: Context объект
-        results: Список результатов
         page: Номер страницы (0-based)
         is_edit: True если нужно отредактировать существующее сообщение
     """
     page_size = 10
+    query_lower, mode = context.user_data.get('search_query', ('', 'title'))
+    catalog = await load_csv_catalog_async()
+    mtime_ns = catalog.mtime_ns if catalog else None
+    if context.user_data.get('search_mtime') != mtime_ns:
+        # Каталог обновился после поиска: сохраненное число совпадений устарело
+        context.user_data['search_total'] = _count_matches(catalog, query_lower, mode)
+        context.user_data['search_mtime'] = mtime_ns
+    total_results = context.user_data.get('search_total', 0)
+    
+    # Страница могла оказаться за концом сократившейся выдачи - показываем последнюю
+    page = min(page, max(total_results - 1, 0) // page_size)
+    context.user_data['search_page'] = page
     start_idx = page * page_size
     end_idx = start_idx + page_size
-    current_results = results[start_idx:end_idx]
-    total_results = len(results)
+    current_results = list(islice(_iter_matches(catalog, query_lower, mode), start_idx, end_idx))
     
     # Формируем кнопки с результатами
     keyboard = []
     for idx, show in enumerate(current_results, start=start_idx + 1):
-        show_name = show.get('short_title', 'Без названия')
-        place = show.get('place', 'Не указано')
+        show_name = show.short_title or 'Без названия'
+        place = show.place or 'Не указано'
         button_text = f"{idx}. {show_name} ({place})"
-        callback_data = f"csv_show:{show.get('id')}:{idx-1}"
+        callback_data = f"csv_show:{show.id}:{idx-1}"
         keyboard.append([InlineKeyboardButton(button_text, callback_data=callback_data)])
     
     # Добавляем кнопку "Другой спектакль (ручной ввод)"
@@ -333,8 +705,11 @@ async def send_csv_results_page(
     
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    text = f"Найдено {total_results} спектаклей. Показаны {start_idx + 1}-{min(end_idx, total_results)}:\n\n" \
-           f"Выберите спектакль:"
+    if total_results:
+        text = f"Найдено {total_results} спектаклей. Показаны {start_idx + 1}-{min(end_idx, total_results)}:\n\n" \
+               f"Выберите спектакль:"
+    else:
+        text = "😔 После обновления каталога по запросу ничего не найдено."
     
     if is_edit:
         query = update.callback_query
@@ -356,10 +731,11 @@ async def process_search_query(update: Update, context: ContextTypes.DEFAULT_TYP
     # Сохраняем запрос для возможного ручного ввода
     context.user_data['last_search_query'] = search_query
     
-    # Ищем в CSV (получаем все результаты для пагинации)
-    results = search_in_csv(search_query, mode=search_mode, limit=None)
+    # Считаем совпадения в CSV; сами результаты выбираются постранично при отправке
+    catalog = await load_csv_catalog_async()
+    total_results = _count_matches(catalog, search_query.lower(), search_mode)
     
-    if not results:
+    if not total_results:
         # Нет результатов - переходим к ручному вводу
         context.user_data['manual_show_name'] = search_query
         await update.message.reply_text(
@@ -369,12 +745,14 @@ async def process_search_query(update: Update, context: ContextTypes.DEFAULT_TYP
         )
         return MANUAL_THEATRE
     
-    # Сохраняем результаты для пагинации
-    context.user_data['search_results'] = results
+    # Сохраняем запрос и число результатов для пагинации
+    context.user_data['search_query'] = (search_query.lower(), search_mode)
+    context.user_data['search_total'] = total_results
+    context.user_data['search_mtime'] = catalog.mtime_ns
     context.user_data['search_page'] = 0
     
     # Отправляем первую страницу результатов
-    await send_csv_results_page(update, context, results, page=0, is_edit=False)
+    await send_csv_results_page(update, context, page=0, is_edit=False)
     return SEARCH_QUERY
 
 
@@ -383,13 +761,12 @@ async def handle_csv_more(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     
-    current_page = int(query.data.split(':')[1])
+    current_page = int(query.data.partition(':')[2])
     next_page = current_page + 1
     
-    results = context.user_data.get('search_results', [])
     context.user_data['search_page'] = next_page
     
-    await send_csv_results_page(update, context, results, page=next_page, is_edit=True)
+    await send_csv_results_page(update, context, page=next_page, is_edit=True)
 
 
 async def handle_csv_prev(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -397,16 +774,15 @@ async def handle_csv_prev(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     
-    current_page = int(query.data.split(':')[1])
+    current_page = int(query.data.partition(':')[2])
     prev_page = current_page - 1
     
     if prev_page < 0:
         prev_page = 0
     
-    results = context.user_data.get('search_results', [])
     context.user_data['search_page'] = prev_page
     
-    await send_csv_results_page(update, context, results, page=prev_page, is_edit=True)
+    await send_csv_results_page(update, context, page=prev_page, is_edit=True)
 
 
 async def handle_csv_manual_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -436,16 +812,13 @@ async def handle_csv_show_selection(update: Update, context: ContextTypes.DEFAUL
     await query.answer()
     
     # Парсим callback data
-    data_parts = query.data.split(':')
-    show_id = data_parts[1]
+    # Формат: csv_show:{id}:{idx}
+    _, _, rest = query.data.partition(':')
+    show_id, _, _ = rest.partition(':')
     
-    # Ищем спектакль в результатах
-    results = context.user_data.get('search_results', [])
-    selected_show = None
-    for show in results:
-        if show.get('id') == show_id:
-            selected_show = show
-            break
+    # Ищем спектакль в каталоге по индексу id
+    catalog = await load_csv_catalog_async()
+    selected_show = catalog.by_id.get(show_id) if catalog else None
     
     if not selected_show:
         await query.edit_message_text("❌ Ошибка: спектакль не найден.")
@@ -453,35 +826,13 @@ async def handle_csv_show_selection(update: Update, context: ContextTypes.DEFAUL
     
     # Сохраняем данные спектакля
     context.user_data['csv_show_id'] = show_id
-    context.user_data['csv_show_name'] = selected_show.get('short_title', 'Без названия')
-    context.user_data['csv_place'] = selected_show.get('place', 'Не указано')
-    
-    # Парсим даты (разделены точкой с запятой)
-    dates_str = selected_show.get('dates', '')
-    schedule = []
+    context.user_data['csv_show_name'] = selected_show.short_title or 'Без названия'
+    context.user_data['csv_place'] = selected_show.place or 'Не указано'
     
-    if dates_str:
-        date_parts = [d.strip() for d in dates_str.split(';') if d.strip()]
-        for date_str in date_parts:
-            # Парсим дату в формате YYYY-MM-DD или YYYY-MM-DD HH:MM:SS
-            try:
-                if ' ' in date_str:
-                    # Дата + время: парсим как московское время, конвертируем в UTC
-                    datetime_obj = datetime.strptime(date_str.split(' - ')[0].strip(), '%Y-%m-%d %H:%M:%S')
-                    datetime_obj_moscow = MOSCOW_TZ.localize(datetime_obj)
-                    datetime_obj_utc = datetime_obj_moscow.astimezone(timezone.utc)
-                else:
-                    # Только дата: парсим как московское время (00:00), конвертируем в UTC
-                    datetime_obj = datetime.strptime(date_str.split(' - ')[0].strip(), '%Y-%m-%d')
-                    datetime_obj_moscow = MOSCOW_TZ.localize(datetime_obj)
-                    datetime_obj_utc = datetime_obj_moscow.astimezone(timezone.utc)
-                
-                schedule.append({
-                    'datetime': datetime_obj_utc,
-                    'label': date_str
-                })
-            except Exception as e:
-                logger.error(f"Ошибка при парсинге даты '{date_str}': {e}")
+    # Даты разобраны заранее при загрузке каталога. Сохраняем показанные пользователю
+    # сеансы (только время в UTC): каталог может обновиться до выбора даты
+    schedule = selected_show.schedule
+    context.user_data['csv_schedule'] = tuple(item['datetime'] for item in schedule)
     
     if not schedule:
         # Нет дат - предлагаем ввести вручную
@@ -495,27 +846,18 @@ async def handle_csv_show_selection(update: Update, context: ContextTypes.DEFAUL
     
     if len(schedule) == 1:
         # Только одна дата - предлагаем подтвердить или ввести другую
-        context.user_data['csv_schedule'] = schedule
         formatted_datetime = format_datetime_for_user(schedule[0]['datetime'])
         
-        keyboard = [
-            [InlineKeyboardButton("✅ Использовать эту дату", callback_data="csv_date_confirm")],
-            [InlineKeyboardButton("✍️ Ввести другую дату", callback_data="csv_date_manual")],
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
         await query.edit_message_text(
             f"Спектакль: {context.user_data['csv_show_name']}\n"
             f"Театр: {context.user_data['csv_place']}\n\n"
             f"📅 Найдена одна дата: {formatted_datetime}\n\n"
             f"Использовать эту дату или ввести другую?",
-            reply_markup=reply_markup
+            reply_markup=CSV_SINGLE_DATE_KEYBOARD
         )
         return MANUAL_SHOW_DATE
     
     # Несколько дат - предлагаем выбрать
-    context.user_data['csv_schedule'] = schedule
-    
     keyboard = []
     for idx, date_item in enumerate(schedule):
         formatted_datetime = format_datetime_for_user(date_item['datetime'])
@@ -543,13 +885,12 @@ async def handle_csv_date_confirm(update: Update, context: ContextTypes.DEFAULT_
     query = update.callback_query
     await query.answer()
     
-    schedule = context.user_data.get('csv_schedule', [])
+    schedule = context.user_data.get('csv_schedule', ())
     if not schedule:
         await query.edit_message_text("❌ Ошибка: даты не найдены.")
         return ConversationHandler.END
     
-    selected_date = schedule[0]
-    datetime_obj = selected_date['datetime']
+    datetime_obj = schedule[0]
     
     # Сохраняем спектакль в БД
     user_id = query.from_user.id
@@ -557,10 +898,11 @@ async def handle_csv_date_confirm(update: Update, context: ContextTypes.DEFAULT_
     theatre = context.user_data.get('csv_place', '')
     external_id = int(context.user_data.get('csv_show_id', 0))
     
-    datetime_str = datetime_obj.strftime('%Y-%m-%d %H:%M:%S')
-    show_date_only = datetime_obj.strftime('%Y-%m-%d')
+    datetime_str = _format_db_datetime(datetime_obj)
+    show_date_only = _format_db_date(datetime_obj)
     
-    show_id = add_show(
+    show_id = await asyncio.to_thread(
+        add_show,
         user_id=user_id,
         theatre=theatre,
         show_name=show_name,
@@ -575,22 +917,13 @@ async def handle_csv_date_confirm(update: Update, context: ContextTypes.DEFAULT_
     
     formatted_datetime = format_datetime_for_user(datetime_obj)
     
-    keyboard = [
-        [InlineKeyboardButton(f"⏰ {REMINDER_1_DAY} до события", callback_data=f"reminder:{REMINDER_1_DAY}")],
-        [InlineKeyboardButton(f"⏰ {REMINDER_6_HOURS} до события", callback_data=f"reminder:{REMINDER_6_HOURS}")],
-        [InlineKeyboardButton(f"⏰ {REMINDER_3_HOURS} до события", callback_data=f"reminder:{REMINDER_3_HOURS}")],
-        [InlineKeyboardButton(f"⏰ {REMINDER_1_HOUR} до события", callback_data=f"reminder:{REMINDER_1_HOUR}")],
-        [InlineKeyboardButton("🚫 Без напоминания", callback_data="reminder:none")],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
     await query.edit_message_text(
         f"✅ Спектакль добавлен!\n\n"
         f"📌 {show_name}\n"
         f"🏛️ {theatre}\n"
         f"📅 {formatted_datetime}\n\n"
         f"Когда напомнить о событии?",
-        reply_markup=reply_markup
+        reply_markup=REMINDER_KEYBOARD
     )
     
     return SELECT_REMINDER
@@ -617,15 +950,14 @@ async def handle_csv_date_selection(update: Update, context: ContextTypes.DEFAUL
     await query.answer()
     
     # Парсим callback data
-    date_idx = int(query.data.split(':')[1])
+    date_idx = int(query.data.partition(':')[2])
     
-    schedule = context.user_data.get('csv_schedule', [])
+    schedule = context.user_data.get('csv_schedule', ())
     if date_idx >= len(schedule):
         await query.edit_message_text("❌ Ошибка: дата не найдена.")
         return ConversationHandler.END
     
-    selected_date = schedule[date_idx]
-    datetime_obj = selected_date['datetime']
+    datetime_obj = schedule[date_idx]
     
     # Сохраняем спектакль в БД
     user_id = query.from_user.id
@@ -633,10 +965,11 @@ async def handle_csv_date_selection(update: Update, context: ContextTypes.DEFAUL
     theatre = context.user_data.get('csv_place', '')
     external_id = int(context.user_data.get('csv_show_id', 0))
     
-    datetime_str = datetime_obj.strftime('%Y-%m-%d %H:%M:%S')
-    show_date_only = datetime_obj.strftime('%Y-%m-%d')
+    datetime_str = _format_db_datetime(datetime_obj)
+    show_date_only = _format_db_date(datetime_obj)
     
-    show_id = add_show(
+    show_id = await asyncio.to_thread(
+        add_show,
         user_id=user_id,
         theatre=theatre,
         show_name=show_name,
@@ -651,22 +984,13 @@ async def handle_csv_date_selection(update: Update, context: ContextTypes.DEFAUL
     
     formatted_datetime = format_datetime_for_user(datetime_obj)
     
-    keyboard = [
-        [InlineKeyboardButton(f"⏰ {REMINDER_1_DAY} до события", callback_data=f"reminder:{REMINDER_1_DAY}")],
-        [InlineKeyboardButton(f"⏰ {REMINDER_6_HOURS} до события", callback_data=f"reminder:{REMINDER_6_HOURS}")],
-        [InlineKeyboardButton(f"⏰ {REMINDER_3_HOURS} до события", callback_data=f"reminder:{REMINDER_3_HOURS}")],
-        [InlineKeyboardButton(f"⏰ {REMINDER_1_HOUR} до события", callback_data=f"reminder:{REMINDER_1_HOUR}")],
-        [InlineKeyboardButton("🚫 Без напоминания", callback_data="reminder:none")],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
     await query.edit_message_text(
         f"✅ Спектакль добавлен!\n\n"
         f"📌 {show_name}\n"
         f"🏛️ {theatre}\n"
         f"📅 {formatted_datetime}\n\n"
         f"Когда напомнить о событии?",
-        reply_markup=reply_markup
+        reply_markup=REMINDER_KEYBOARD
     )
     
     return SELECT_REMINDER
@@ -732,10 +1056,11 @@ async def process_manual_show_date(update: Update, context: ContextTypes.DEFAULT
         external_id = None
         source = 'manual'
     
-    datetime_str = datetime_obj_utc.strftime('%Y-%m-%d %H:%M:%S')
-    show_date_only = datetime_obj_utc.strftime('%Y-%m-%d')
+    datetime_str = _format_db_datetime(datetime_obj_utc)
+    show_date_only = _format_db_date(datetime_obj_utc)
     
-    show_id = add_show(
+    show_id = await asyncio.to_thread(
+        add_show,
         user_id=user_id,
         theatre=theatre,
         show_name=show_name,
@@ -750,22 +1075,13 @@ async def process_manual_show_date(update: Update, context: ContextTypes.DEFAULT
     
     formatted_datetime = format_datetime_for_user(datetime_obj_utc)
     
-    keyboard = [
-        [InlineKeyboardButton(f"⏰ {REMINDER_1_DAY} до события", callback_data=f"reminder:{REMINDER_1_DAY}")],
-        [InlineKeyboardButton(f"⏰ {REMINDER_6_HOURS} до события", callback_data=f"reminder:{REMINDER_6_HOURS}")],
-        [InlineKeyboardButton(f"⏰ {REMINDER_3_HOURS} до события", callback_data=f"reminder:{REMINDER_3_HOURS}")],
-        [InlineKeyboardButton(f"⏰ {REMINDER_1_HOUR} до события", callback_data=f"reminder:{REMINDER_1_HOUR}")],
-        [InlineKeyboardButton("🚫 Без напоминания", callback_data="reminder:none")],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
     await update.message.reply_text(
         f"✅ Спектакль добавлен!\n\n"
         f"📌 {show_name}\n"
         f"🏛️ {theatre}\n"
         f"📅 {formatted_datetime}\n\n"
         f"Когда напомнить о событии?",
-        reply_markup=reply_markup
+        reply_markup=REMINDER_KEYBOARD
     )
     
     return SELECT_REMINDER
@@ -776,7 +1092,7 @@ async def handle_reminder_selection(update: Update, context: ContextTypes.DEFAUL
     query = update.callback_query
     await query.answer()
     
-    reminder_type = query.data.split(':')[1]
+    reminder_type = query.data.partition(':')[2]
     
     show_id = context.user_data.get('current_show_id')
     show_datetime = context.user_data.get('show_datetime')
@@ -791,28 +1107,21 @@ async def handle_reminder_selection(update: Update, context: ContextTypes.DEFAUL
         return ConversationHandler.END
     
     # Вычисляем время напоминания
-    if reminder_type == REMINDER_1_DAY:
-        reminder_delta = timedelta(days=1)
-    elif reminder_type == REMINDER_6_HOURS:
-        reminder_delta = timedelta(hours=6)
-    elif reminder_type == REMINDER_3_HOURS:
-        reminder_delta = timedelta(hours=3)
-    elif reminder_type == REMINDER_1_HOUR:
-        reminder_delta = timedelta(hours=1)
-    else:
+    reminder_delta = _REMINDER_DELTAS.get(reminder_type)
+    if reminder_delta is None:
         await query.edit_message_text("❌ Неизвестный тип напоминания.")
         context.user_data.clear()
         return ConversationHandler.END
     
     reminder_time = show_datetime - reminder_delta
-    reminder_time_str = reminder_time.strftime('%Y-%m-%d %H:%M:%S')
     
-    # Сохраняем напоминание
+    # Сохраняем напоминание (в БД - секунды Unix epoch)
     user_id = query.from_user.id
-    update_show(
+    await asyncio.to_thread(
+        update_show,
         show_id=show_id,
         user_id=user_id,
-        notify_at=reminder_time_str
+        notify_at=int(reminder_time.timestamp())
     )
     
     # Форматируем для отображения пользователю
@@ -830,38 +1139,49 @@ async def handle_reminder_selection(update: Update, context: ContextTypes.DEFAUL
     return ConversationHandler.END
 
 
+@lru_cache(maxsize=SHOW_MARKUP_CACHE_SIZE)
+def _build_show_markup(show_id: int) -> InlineKeyboardMarkup:
+    """
+    Возвращает клавиатуру действий со спектаклем для /my_shows.
+    
+    Args:
+        show_id: ID спектакля в БД
+    
+    Returns:
+        Клавиатура с кнопками редактирования, удаления и экспорта
+    """
+    return InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton(SHOW_EDIT_LABEL, callback_data=f"edit_show:{show_id}"),
+            InlineKeyboardButton(SHOW_DELETE_LABEL, callback_data=f"delete_show:{show_id}")
+        ],
+        [InlineKeyboardButton(SHOW_EXPORT_LABEL, callback_data=f"export_single:{show_id}")]
+    ])
+
+
 async def cmd_my_shows(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /my_shows."""
     user_id = update.effective_user.id
-    shows = get_user_shows(user_id)
+    shows = await asyncio.to_thread(get_user_shows, user_id)
     
     if not shows:
         await update.message.reply_text("У вас пока нет сохраненных спектаклей.")
         return
     
-    # Формируем список спектаклей с кнопками
+    # Сначала формируем все сообщения со списком спектаклей и кнопками
+    payloads = []
     for show in shows:
         show_datetime_str = show.get('datetime') or show.get('show_date', '')
         try:
-            if ' ' in show_datetime_str:
-                dt_utc = datetime.strptime(show_datetime_str, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
-                formatted_date = format_datetime_for_user(dt_utc)
-            else:
-                dt_utc = datetime.strptime(show_datetime_str, '%Y-%m-%d').replace(tzinfo=timezone.utc)
-                formatted_date = format_datetime_for_user(dt_utc)
-        except:
+            formatted_date = format_datetime_for_user(show_datetime_str)
+        except ValueError:
             formatted_date = show_datetime_str
         
         # Проверяем наличие напоминания
         notify_at = show.get('notify_at')
         reminder_text = ""
         if notify_at:
-            try:
-                notify_dt = datetime.strptime(notify_at, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
-                reminder_formatted = format_datetime_for_user(notify_dt)
-                reminder_text = f"\n⏰ Напоминание: {reminder_formatted}"
-            except:
-                pass
+            reminder_text = f"\n⏰ Напоминание: {_format_notify_at(notify_at)}"
         
         text = (
             f"📌 {show['show_name']}\n"
@@ -869,37 +1189,32 @@ async def cmd_my_shows(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"📅 {formatted_date}"
             f"{reminder_text}"
         )
-        
-        keyboard = [
-            [
-                InlineKeyboardButton("✏️ Редактировать", callback_data=f"edit_show:{show['id']}"),
-                InlineKeyboardButton("🗑️ Удалить", callback_data=f"delete_show:{show['id']}")
-            ],
-            [InlineKeyboardButton("📄 Экспортировать", callback_data=f"export_single:{show['id']}")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
+        payloads.append((text, _build_show_markup(show['id'])))
+    
+    # Затем отправляем по одному: карточки приходят в чат в порядке дат,
+    # а частота сообщений в один чат не превышает лимит Telegram
+    for text, reply_markup in payloads:
+        await MESSAGE_RATE_LIMITER.wait()
         await update.message.reply_text(text, reply_markup=reply_markup)
 
 
 async def cmd_export(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /export - экспортирует все спектакли."""
     user_id = update.effective_user.id
-    shows = get_user_shows(user_id)
+    shows = await asyncio.to_thread(get_user_shows, user_id)
     
     if not shows:
         await update.message.reply_text("У вас нет спектаклей для экспорта.")
         return
     
     try:
-        file_path = generate_txt(shows, user_id)
-        
-        with open(file_path, 'rb') as f:
-            await update.message.reply_document(
-                document=f,
-                filename=file_path.name,
-                caption=f"📄 Экспорт всех спектаклей ({len(shows)} шт.)"
-            )
+        # Файл формируется в памяти и отправляется из буфера, без записи на диск
+        filename, data = await build_txt_export_async(shows, user_id)
+        await update.message.reply_document(
+            document=io.BytesIO(data),
+            filename=filename,
+            caption=f"📄 Экспорт всех спектаклей ({len(shows)} шт.)"
+        )
     except Exception as e:
         logger.error(f"Ошибка при экспорте: {e}")
         await update.message.reply_text(f"❌ Ошибка при создании файла экспорта: {e}")
@@ -910,23 +1225,22 @@ async def handle_export_single(update: Update, context: ContextTypes.DEFAULT_TYP
     query = update.callback_query
     await query.answer()
     
-    show_id = int(query.data.split(':')[1])
+    show_id = int(query.data.partition(':')[2])
     user_id = query.from_user.id
     
-    show = get_show_by_id(show_id, user_id)
+    show = await asyncio.to_thread(get_show_by_id, show_id, user_id)
     if not show:
         await query.edit_message_text("❌ Спектакль не найден.")
         return
     
     try:
-        file_path = generate_txt([], user_id, single_show=show)
-        
-        with open(file_path, 'rb') as f:
-            await query.message.reply_document(
-                document=f,
-                filename=file_path.name,
-                caption=f"📄 Экспорт спектакля: {show['show_name']}"
-            )
+        # Файл формируется в памяти и отправляется из буфера, без записи на диск
+        filename, data = await build_txt_export_async([], user_id, single_show=show)
+        await query.message.reply_document(
+            document=io.BytesIO(data),
+            filename=filename,
+            caption=f"📄 Экспорт спектакля: {show['show_name']}"
+        )
     except Exception as e:
         logger.error(f"Ошибка при экспорте одного спектакля: {e}")
         await query.message.reply_text(f"❌ Ошибка при создании файла экспорта: {e}")
@@ -937,11 +1251,11 @@ async def handle_delete_show(update: Update, context: ContextTypes.DEFAULT_TYPE)
     query = update.callback_query
     await query.answer()
     
-    show_id = int(query.data.split(':')[1])
+    show_id = int(query.data.partition(':')[2])
     user_id = query.from_user.id
     
     # Получаем информацию о спектакле для отображения
-    show = get_show_by_id(show_id, user_id)
+    show = await asyncio.to_thread(get_show_by_id, show_id, user_id)
     if not show:
         await query.edit_message_text("❌ Спектакль не найден.")
         return
@@ -969,10 +1283,10 @@ async def handle_confirm_delete(update: Update, context: ContextTypes.DEFAULT_TY
     query = update.callback_query
     await query.answer()
     
-    show_id = int(query.data.split(':')[1])
+    show_id = int(query.data.partition(':')[2])
     user_id = query.from_user.id
     
-    if delete_show(show_id, user_id):
+    if await asyncio.to_thread(delete_show, show_id, user_id):
         await query.edit_message_text("✅ Спектакль удален.")
     else:
         await query.edit_message_text("❌ Не удалось удалить спектакль.")
@@ -990,10 +1304,10 @@ async def handle_edit_show(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     
-    show_id = int(query.data.split(':')[1])
+    show_id = int(query.data.partition(':')[2])
     user_id = query.from_user.id
     
-    show = get_show_by_id(show_id, user_id)
+    show = await asyncio.to_thread(get_show_by_id, show_id, user_id)
     if not show:
         await query.edit_message_text("❌ Спектакль не найден.")
         return ConversationHandler.END
@@ -1004,34 +1318,16 @@ async def handle_edit_show(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Форматируем дату и напоминание для отображения
     show_datetime_str = show.get('datetime') or show.get('show_date', 'Не указано')
     try:
-        if ' ' in show_datetime_str:
-            dt_utc = datetime.strptime(show_datetime_str, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
-            formatted_date = format_datetime_for_user(dt_utc)
-        else:
-            dt_utc = datetime.strptime(show_datetime_str, '%Y-%m-%d').replace(tzinfo=timezone.utc)
-            formatted_date = format_datetime_for_user(dt_utc)
-    except:
+        formatted_date = format_datetime_for_user(show_datetime_str)
+    except ValueError:
         formatted_date = show_datetime_str
     
     notify_at = show.get('notify_at')
     reminder_formatted = "Не установлено"
     if notify_at:
-        try:
-            notify_dt = datetime.strptime(notify_at, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
-            reminder_formatted = format_datetime_for_user(notify_dt)
-        except:
-            pass
+        reminder_formatted = _format_notify_at(notify_at)
     
     # Отображаем текущие данные и кнопки для редактирования
-    keyboard = [
-        [InlineKeyboardButton("📝 Изменить название", callback_data="edit_field:show_name")],
-        [InlineKeyboardButton("🏛️ Изменить театр", callback_data="edit_field:theatre")],
-        [InlineKeyboardButton("📅 Изменить дату", callback_data="edit_field:show_date")],
-        [InlineKeyboardButton("⏰ Изменить напоминание", callback_data="edit_field:reminder")],
-        [InlineKeyboardButton("❌ Отмена", callback_data="edit_cancel:")],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
     await query.edit_message_text(
         f"Редактирование спектакля:\n\n"
         f"📌 Название: {show['show_name']}\n"
@@ -1039,7 +1335,7 @@ async def handle_edit_show(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"📅 Дата: {formatted_date}\n"
         f"⏰ Напоминание: {reminder_formatted}\n\n"
         f"Выберите, что хотите изменить:",
-        reply_markup=reply_markup
+        reply_markup=EDIT_FIELD_KEYBOARD
     )
 
 
@@ -1048,7 +1344,7 @@ async def handle_edit_field(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     
-    field = query.data.split(':')[1]
+    field = query.data.partition(':')[2]
     context.user_data['editing_field'] = field
     
     if field == 'show_name':
@@ -1062,16 +1358,7 @@ async def handle_edit_field(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return EDIT_SHOW_DATE
     elif field == 'reminder':
         # Показываем опции напоминания
-        keyboard = [
-            [InlineKeyboardButton(f"⏰ {REMINDER_1_DAY} до события", callback_data=f"edit_reminder:{REMINDER_1_DAY}")],
-            [InlineKeyboardButton(f"⏰ {REMINDER_6_HOURS} до события", callback_data=f"edit_reminder:{REMINDER_6_HOURS}")],
-            [InlineKeyboardButton(f"⏰ {REMINDER_3_HOURS} до события", callback_data=f"edit_reminder:{REMINDER_3_HOURS}")],
-            [InlineKeyboardButton(f"⏰ {REMINDER_1_HOUR} до события", callback_data=f"edit_reminder:{REMINDER_1_HOUR}")],
-            [InlineKeyboardButton("🗑️ Удалить напоминание", callback_data="edit_reminder:delete")],
-            [InlineKeyboardButton("❌ Отмена", callback_data="edit_cancel:")],
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text("Выберите время напоминания:", reply_markup=reply_markup)
+        await query.edit_message_text("Выберите время напоминания:", reply_markup=EDIT_REMINDER_KEYBOARD)
         return EDIT_REMINDER
 
 
@@ -1081,7 +1368,7 @@ async def process_edit_show_name(update: Update, context: ContextTypes.DEFAULT_T
     show_id = context.user_data.get('editing_show_id')
     user_id = update.effective_user.id
     
-    if update_show(show_id, user_id, show_name=new_name):
+    if await asyncio.to_thread(update_show, show_id, user_id, show_name=new_name):
         await update.message.reply_text(f"✅ Название обновлено: {new_name}")
     else:
         await update.message.reply_text("❌ Не удалось обновить название.")
@@ -1096,7 +1383,7 @@ async def process_edit_show_theatre(update: Update, context: ContextTypes.DEFAUL
     show_id = context.user_data.get('editing_show_id')
     user_id = update.effective_user.id
     
-    if update_show(show_id, user_id, theatre=new_theatre):
+    if await asyncio.to_thread(update_show, show_id, user_id, theatre=new_theatre):
         await update.message.reply_text(f"✅ Театр обновлен: {new_theatre}")
     else:
         await update.message.reply_text("❌ Не удалось обновить театр.")
@@ -1129,10 +1416,10 @@ async def process_edit_show_date(update: Update, context: ContextTypes.DEFAULT_T
     show_id = context.user_data.get('editing_show_id')
     user_id = update.effective_user.id
     
-    datetime_str = datetime_obj_utc.strftime('%Y-%m-%d %H:%M:%S')
-    show_date_only = datetime_obj_utc.strftime('%Y-%m-%d')
+    datetime_str = _format_db_datetime(datetime_obj_utc)
+    show_date_only = _format_db_date(datetime_obj_utc)
     
-    if update_show(show_id, user_id, show_date=show_date_only, datetime_str=datetime_str):
+    if await asyncio.to_thread(update_show, show_id, user_id, show_date=show_date_only, datetime_str=datetime_str):
         formatted_datetime = format_datetime_for_user(datetime_obj_utc)
         await update.message.reply_text(f"✅ Дата обновлена: {formatted_datetime}")
     else:
@@ -1147,12 +1434,12 @@ async def handle_edit_reminder(update: Update, context: ContextTypes.DEFAULT_TYP
     query = update.callback_query
     await query.answer()
     
-    reminder_type = query.data.split(':')[1]
+    reminder_type = query.data.partition(':')[2]
     show_id = context.user_data.get('editing_show_id')
     user_id = query.from_user.id
     
     # Получаем информацию о спектакле для вычисления времени напоминания
-    show = get_show_by_id(show_id, user_id)
+    show = await asyncio.to_thread(get_show_by_id, show_id, user_id)
     if not show:
         await query.edit_message_text("❌ Спектакль не найден.")
         context.user_data.clear()
@@ -1160,7 +1447,7 @@ async def handle_edit_reminder(update: Update, context: ContextTypes.DEFAULT_TYP
     
     if reminder_type == "delete":
         # Удаляем напоминание
-        if update_show(show_id, user_id, notify_at=""):
+        if await asyncio.to_thread(update_show, show_id, user_id, notify_at=""):
             await query.edit_message_text("✅ Напоминание удалено.")
         else:
             await query.edit_message_text("❌ Не удалось удалить напоминание.")
@@ -1170,33 +1457,22 @@ async def handle_edit_reminder(update: Update, context: ContextTypes.DEFAULT_TYP
     # Получаем дату спектакля
     show_datetime_str = show.get('datetime') or show.get('show_date')
     try:
-        if ' ' in show_datetime_str:
-            show_datetime = datetime.strptime(show_datetime_str, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
-        else:
-            show_datetime = datetime.strptime(show_datetime_str, '%Y-%m-%d').replace(tzinfo=timezone.utc)
-    except:
+        show_datetime = _parse_stored_dt(show_datetime_str)
+    except ValueError:
         await query.edit_message_text("❌ Ошибка при парсинге даты спектакля.")
         context.user_data.clear()
         return ConversationHandler.END
     
     # Вычисляем время напоминания
-    if reminder_type == REMINDER_1_DAY:
-        reminder_delta = timedelta(days=1)
-    elif reminder_type == REMINDER_6_HOURS:
-        reminder_delta = timedelta(hours=6)
-    elif reminder_type == REMINDER_3_HOURS:
-        reminder_delta = timedelta(hours=3)
-    elif reminder_type == REMINDER_1_HOUR:
-        reminder_delta = timedelta(hours=1)
-    else:
+    reminder_delta = _REMINDER_DELTAS.get(reminder_type)
+    if reminder_delta is None:
         await query.edit_message_text("❌ Неизвестный тип напоминания.")
         context.user_data.clear()
         return ConversationHandler.END
     
     reminder_time = show_datetime - reminder_delta
-    reminder_time_str = reminder_time.strftime('%Y-%m-%d %H:%M:%S')
     
-    if update_show(show_id, user_id, notify_at=reminder_time_str):
+    if await asyncio.to_thread(update_show, show_id, user_id, notify_at=int(reminder_time.timestamp())):
         reminder_time_display = format_datetime_for_user(reminder_time)
         await query.edit_message_text(
             f"✅ Напоминание обновлено!\n"
@@ -1220,7 +1496,7 @@ async def handle_edit_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 async def cmd_theatres(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /theatres - показывает список театров."""
-    theatres = get_theatres_stats()
+    theatres = await asyncio.to_thread(get_theatres_stats)
     
     if not theatres:
         await update.message.reply_text("В базе пока нет театров.")
@@ -1241,49 +1517,61 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ConversationHandler.END
 
 
-def check_reminders(application: Application):
-    """Фоновая задача для проверки и отправки напоминаний."""
+async def _send_reminder(bot, show) -> None:
+    """
+    Отправляет пользователю напоминание об одном спектакле.
+    
+    Args:
+        bot: Бот, от имени которого отправляется сообщение
+        show: Строка спектакля из get_pending_notifications
+    """
+    show_datetime_str = show.get('datetime') or show.get('show_date', 'Не указано')
+    try:
+        formatted_date = format_datetime_for_user(show_datetime_str)
+    except ValueError:
+        formatted_date = show_datetime_str
+    
+    message = (
+        f"⏰ *Напоминание о спектакле!*\n\n"
+        f"📌 {show['show_name']}\n"
+        f"🏛️ {show['theatre']}\n"
+        f"📅 {formatted_date}\n\n"
+        f"Не пропустите!"
+    )
+    
+    await MESSAGE_RATE_LIMITER.wait()
+    await bot.send_message(
+        chat_id=show['user_id'],
+        text=message,
+        parse_mode='Markdown'
+    )
+
+
+async def check_reminders(context: ContextTypes.DEFAULT_TYPE):
+    """Периодическая задача JobQueue для проверки и отправки напоминаний."""
     try:
-        current_time = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
-        pending = get_pending_notifications(current_time)
+        now = datetime.now(timezone.utc)
+        pending = await asyncio.to_thread(get_pending_notifications, int(now.timestamp()))
         
-        logger.info(f"[REMINDERS] Проверка напоминаний в {current_time} UTC. Найдено: {len(pending)}")
+        logger.info(f"[REMINDERS] Проверка напоминаний в {_format_db_datetime(now)} UTC. Найдено: {len(pending)}")
         
-        for show in pending:
-            try:
-                show_datetime_str = show.get('datetime') or show.get('show_date', 'Не указано')
-                try:
-                    if ' ' in show_datetime_str:
-                        dt_utc = datetime.strptime(show_datetime_str, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
-                        formatted_date = format_datetime_for_user(dt_utc)
-                    else:
-                        dt_utc = datetime.strptime(show_datetime_str, '%Y-%m-%d').replace(tzinfo=timezone.utc)
-                        formatted_date = format_datetime_for_user(dt_utc)
-                except:
-                    formatted_date = show_datetime_str
-                
-                message = (
-                    f"⏰ *Напоминание о спектакле!*\n\n"
-                    f"📌 {show['show_name']}\n"
-                    f"🏛️ {show['theatre']}\n"
-                    f"📅 {formatted_date}\n\n"
-                    f"Не пропустите!"
-                )
-                
-                import asyncio
-                asyncio.create_task(
-                    application.bot.send_message(
-                        chat_id=show['user_id'],
-                        text=message,
-                        parse_mode='Markdown'
-                    )
-                )
-                
-                mark_notification_sent(show['id'])
+        # Напоминания отправляются параллельно, с частотой не выше MESSAGES_PER_SECOND
+        # (MESSAGE_RATE_LIMITER): ожидание ответов одних отправок не задерживает другие
+        results = await asyncio.gather(
+            *(_send_reminder(context.bot, show) for show in pending),
+            return_exceptions=True
+        )
+        
+        # Отправленные напоминания отмечаются одним запросом в конце проверки
+        sent_ids = []
+        for show, result in zip(pending, results):
+            if isinstance(result, Exception):
+                logger.error(f"[REMINDERS] Ошибка при отправке напоминания для спектакля {show['id']}: {result}")
+            else:
+                sent_ids.append(show['id'])
                 logger.info(f"[REMINDERS] Отправлено напоминание для спектакля {show['id']} пользователю {show['user_id']}")
-            
-            except Exception as e:
-                logger.error(f"[REMINDERS] Ошибка при отправке напоминания для спектакля {show['id']}: {e}")
+        
+        await asyncio.to_thread(mark_notifications_sent, sent_ids)
         
         # Логируем время следующей проверки
         next_check = datetime.now(timezone.utc) + timedelta(minutes=10)
@@ -1293,6 +1581,86 @@ def check_reminders(application: Application):
         logger.error(f"[REMINDERS] Ошибка в check_reminders: {e}")
 
 
+# Маршруты callback-кнопок вне ConversationHandler: префикс callback_data (до ':') -> обработчик
+CALLBACK_ROUTES = {
+    'use_current_csv': handle_csv_choice,
+    'update_csv': handle_csv_choice,
+    'export_single': handle_export_single,
+    'delete_show': handle_delete_show,
+    'confirm_delete': handle_confirm_delete,
+    'cancel_delete': handle_cancel_delete,
+    'edit_cancel': handle_edit_cancel,
+}
+
+
+def _is_routed_callback(data) -> bool:
+    """Проверяет, есть ли для callback_data маршрут в CALLBACK_ROUTES (вместо перебора регулярных выражений)."""
+    return isinstance(data, str) and data.partition(':')[0] in CALLBACK_ROUTES
+
+
+async def dispatch_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Передает callback-запрос обработчику, выбранному по префиксу callback_data."""
+    handler = CALLBACK_ROUTES[update.callback_query.data.partition(':')[0]]
+    return await handler(update, context)
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Обрабатывает апдейты разных пользователей параллельно, а апдейты одного
+    пользователя - строго по очереди.
+    
+    ConversationHandler рассчитывает на последовательную обработку: без очереди
+    на пользователя двойное нажатие кнопки или сообщение, пришедшее во время
+    работы предыдущего обработчика, гоняются за состояние диалога.
+    """
+    
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        # user_id -> очередь апдейтов, ожидающих завершения текущего апдейта пользователя
+        self._user_queues: Dict[int, Deque[Awaitable]] = {}
+    
+    async def do_process_update(self, update: object, coroutine: Awaitable) -> None:
+        """
+        Обрабатывает апдейт или ставит его в очередь пользователя.
+        
+        Глобальный слот (max_concurrent_updates) занимает только тот, кто реально
+        обрабатывает апдейты пользователя: остальные апдейты этого пользователя
+        сразу освобождают слот и ждут в очереди, не мешая другим пользователям.
+        """
+        user = update.effective_user if isinstance(update, Update) else None
+        if user is None:
+            await coroutine
+            return
+        
+        queue = self._user_queues.get(user.id)
+        if queue is not None:
+            # У пользователя уже идет обработка: она заберет апдейт из очереди после текущего
+            queue.append(coroutine)
+            return
+        
+        queue = self._user_queues[user.id] = deque()
+        try:
+            while True:
+                try:
+                    await coroutine
+                except Exception:
+                    logger.exception("Ошибка при обработке апдейта пользователя %s", user.id)
+                if not queue:
+                    break
+                coroutine = queue.popleft()
+        finally:
+            # Очередь удаляем, когда у пользователя не осталось апдейтов, чтобы словарь не рос
+            del self._user_queues[user.id]
+            for pending in queue:
+                pending.close()
+    
+    async def initialize(self) -> None:
+        """Дополнительная инициализация не нужна."""
+    
+    async def shutdown(self) -> None:
+        """Дополнительное завершение не нужно."""
+
+
 async def set_bot_commands(application: Application):
     """Устанавливает команды бота в меню."""
     commands = [
@@ -1319,27 +1687,29 @@ def main():
     # Инициализация БД
     init_db()
     
-    # Создаем приложение с прокси (если указан)
+    # Создаем приложение с прокси (если указан); апдейты разных пользователей
+    # обрабатываются параллельно, апдейты одного пользователя - по очереди
+    # (PerUserUpdateProcessor). Команды бота регистрируются в post_init, сразу после инициализации
+    request = HTTPXRequest(proxy=PROXY_URL, **HTTP_REQUEST_SETTINGS)
     if PROXY_URL:
-        from telegram.request import HTTPXRequest
-        request = HTTPXRequest(proxy=PROXY_URL)
-        application = Application.builder().token(BOT_TOKEN).request(request).build()
         logger.info(f"Используется прокси: {PROXY_URL}")
-    else:
-        application = Application.builder().token(BOT_TOKEN).build()
-    
-    # Регистрируем команды бота
-    application.job_queue.run_once(set_bot_commands, when=0)
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .request(request)
+        .concurrent_updates(PerUserUpdateProcessor(MAX_CONCURRENT_UPDATES))
+        .post_init(set_bot_commands)
+        .build()
+    )
     
     # Настройка планировщика для напоминаний (проверка каждые 10 минут)
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(
-        lambda: check_reminders(application),
-        'interval',
-        seconds=10*60,  # 10 минут
-        id='check_reminders'
+    # JobQueue выполняет корутину в цикле событий бота, отдельный планировщик не нужен
+    application.job_queue.run_repeating(
+        check_reminders,
+        interval=10*60,  # 10 минут
+        first=10,
+        name='check_reminders'
     )
-    scheduler.start()
     logger.info("Планировщик напоминаний запущен (интервал: 10 минут)")
     
     # Обработчики команд
@@ -1349,15 +1719,9 @@ def main():
     application.add_handler(CommandHandler("export", cmd_export))
     application.add_handler(CommandHandler("theatres", cmd_theatres))
     
-    # Обработчики callback-запросов (вне ConversationHandler)
-    application.add_handler(CallbackQueryHandler(handle_csv_choice, pattern="^(use_current_csv|update_csv)$"))
-    application.add_handler(CallbackQueryHandler(handle_export_single, pattern="^export_single:"))
-    application.add_handler(CallbackQueryHandler(handle_delete_show, pattern="^delete_show:"))
-    application.add_handler(CallbackQueryHandler(handle_confirm_delete, pattern="^confirm_delete:"))
-    application.add_handler(CallbackQueryHandler(handle_cancel_delete, pattern="^cancel_delete$"))
-    
-    # Глобальная кнопка отмены для редактирования
-    application.add_handler(CallbackQueryHandler(handle_edit_cancel, pattern="^edit_cancel:"))
+    # Обработчики callback-запросов (вне ConversationHandler), включая глобальную
+    # кнопку отмены редактирования: один обработчик с маршрутизацией по префиксу
+    application.add_handler(CallbackQueryHandler(dispatch_callback, pattern=_is_routed_callback))
     
     # ConversationHandler для добавления спектакля
     add_show_handler = ConversationHandler(
@@ -1408,9 +1772,20 @@ def main():
     # Обработчик для выбора поля редактирования (должен быть после ConversationHandler)
     application.add_handler(CallbackQueryHandler(handle_edit_field, pattern="^edit_field:"))
     
-    # Запуск бота
-    logger.info("Бот запущен...")
-    application.run_polling()
+    # Запуск бота: webhook, если задан публичный адрес, иначе long polling
+    if WEBHOOK_URL:
+        url_path = f"webhook/{WEBHOOK_SECRET}" if WEBHOOK_SECRET else "webhook"
+        logger.info(f"Бот запущен (webhook, порт {WEBHOOK_PORT})...")
+        application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=url_path,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{url_path}",
+            secret_token=WEBHOOK_SECRET,
+        )
+    else:
+        logger.info("Бот запущен...")
+        application.run_polling()
 
 
 if __name__ == "__main__":
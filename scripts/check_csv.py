@@ -6,18 +6,30 @@ csv_path = Path(__file__).parent.parent / "data" / "shows_catalog.csv"
 
 with open(csv_path, 'r', encoding='utf-8') as f:
     reader = csv.DictReader(f)
-    rows = list(reader)
     
-    print(f"Всего записей: {len(rows)}")
-    print(f"Колонки: {reader.fieldnames}\n")
+    # Один потоковый проход: считаем записи и сохраняем только строки для примеров
+    total_count = 0
+    filled_count = 0
+    first5 = []
+    filled = []
+    for row in reader:
+        total_count += 1
+        if len(first5) < 5:
+            first5.append(row)
+        
+        # Записи с заполненными полями
+        if row.get('place') or row.get('dates') or row.get('location'):
+            filled_count += 1
+            if len(filled) < 3:
+                filled.append(row)
     
-    # Находим записи с заполненными полями
-    filled = [r for r in rows if r.get('place') or r.get('dates') or r.get('location')]
-    print(f"Записей с заполненными полями: {len(filled)}\n")
+    print(f"Всего записей: {total_count}")
+    print(f"Колонки: {reader.fieldnames}\n")
+    print(f"Записей с заполненными полями: {filled_count}\n")
     
     # Показываем первые 5 записей
     print("Первые 5 записей:")
-    for i, row in enumerate(rows[:5], 1):
+    for i, row in enumerate(first5, 1):
         print(f"\n{i}. ID: {row['id']}")
         print(f"   Short title: {row['short_title'][:60]}")
         print(f"   Place: {row['place'][:60] if row['place'] else '(пусто)'}")
@@ -27,7 +39,7 @@ with open(csv_path, 'r', encoding='utf-8') as f:
     # Показываем записи с заполненными полями
     if filled:
         print(f"\n\nПримеры записей с заполненными полями (первые 3):")
-        for i, row in enumerate(filled[:3], 1):
+        for i, row in enumerate(filled, 1):
             print(f"\n{i}. ID: {row['id']}")
             print(f"   Short title: {row['short_title'][:60]}")
             print(f"   Place: {row['place'][:60]}")
@@ -1,9 +1,17 @@
 """Скрипт для выгрузки данных о спектаклях из API KudaGo."""
 import sys
-import csv
+import asyncio
+import functools
+import gzip
 import logging
+import os
+import re
+import time
 from pathlib import Path
 from datetime import datetime, timezone
+from typing import Dict, List, Optional, TextIO, Tuple
+
+import orjson
 
 # Добавляем корневую директорию проекта в путь
 project_root = Path(__file__).parent.parent
@@ -18,39 +26,102 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Время (в секундах), в течение которого уже выгруженный каталог считается свежим
+# и не загружается заново; переопределяется переменной окружения SHOWS_TTL (0 - всегда обновлять)
+SHOWS_TTL = int(os.environ.get("SHOWS_TTL", "3600"))
+
+# Файл кэша списка городов KudaGo и время его жизни (справочник меняется редко)
+CITIES_CACHE_PATH = project_root / "data" / ".cities_cache.json"
+CITIES_CACHE_TTL = 24 * 60 * 60
+
+# Колонки выходного CSV файла
+CSV_FIELDNAMES = ['id', 'short_title', 'place', 'dates', 'location']
+
+# Конец строки CSV (как у csv.writer по умолчанию)
+CSV_LINE_END = '\r\n'
+
+# Заголовок CSV файла
+CSV_HEADER = ','.join(CSV_FIELDNAMES) + CSV_LINE_END
+
+# Символы, при наличии которых значение поля берется в кавычки (как csv.QUOTE_MINIMAL)
+_CSV_SPECIAL_RE = re.compile(r'[,"\r\n]')
 
-def fetch_moscow_shows(output_file: str = None):
+# Размер буфера записи CSV файла (1 МБ): меньше системных вызовов write()
+CSV_WRITE_BUFFER_SIZE = 1 << 20
+
+# Уровень сжатия gzip при выгрузке в .csv.gz (1 - быстрый, сжатие текста CSV все равно в несколько раз)
+CSV_GZIP_LEVEL = 1
+
+# Количество строк, после накопления которых они записываются в CSV файл одним вызовом write
+CSV_WRITE_BATCH = 1000
+
+
+def _load_cached_cities(api: KudaGoAPI, path: Path = CITIES_CACHE_PATH, ttl_seconds: int = CITIES_CACHE_TTL) -> List[Dict]:
     """
-    Выгружает данные о спектаклях из Москвы и сохраняет в CSV.
+    Возвращает список городов из файлового кэша или из API (с обновлением кэша).
     
     Args:
-        output_file: Путь к выходному CSV файлу (по умолчанию data/shows_catalog.csv)
+        api: Клиент KudaGo API
+        path: Путь к файлу кэша
+        ttl_seconds: Время жизни кэша в секундах
+    
+    Returns:
+        Список словарей с информацией о городах
     """
-    # Определяем путь к файлу
-    if output_file is None:
-        output_file = project_root / "data" / "shows_catalog.csv"
+    try:
+        if time.time() - path.stat().st_mtime < ttl_seconds:
+            cities = orjson.loads(path.read_bytes())
+            logger.info(f"Список городов загружен из кэша {path}")
+            return cities
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        logger.warning(f"Не удалось прочитать кэш городов {path}: {e}")
     
-    output_path = Path(output_file)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    cities = api.get_cities()
+    # Пустой список означает ошибку запроса - такой результат не кэшируем
+    if cities:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(orjson.dumps(cities))
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить кэш городов {path}: {e}")
+    return cities
+
+
+@functools.cache
+def _get_api() -> KudaGoAPI:
+    """Возвращает общий для процесса клиент KudaGo API."""
+    return KudaGoAPI()
+
+
+@functools.cache
+def _resolve_moscow(api: KudaGoAPI) -> Tuple[Optional[int], str]:
+    """
+    Находит Москву в списке городов KudaGo (результат кэшируется на время работы процесса).
     
-    # Инициализируем API клиент
-    api = KudaGoAPI()
+    Args:
+        api: Клиент KudaGo API
     
+    Returns:
+        Кортеж (ID города или None, slug города для параметра location)
+    """
     logger.info("Получение ID города Москва...")
-    cities = api.get_cities()
+    cities = _load_cached_cities(api)
     logger.info(f"Получено городов: {len(cities)}")
     
-    # Ищем Москву по разным вариантам названия
+    # Ищем Москву сначала по slug (поиск в словаре), затем по названию
+    cities_by_slug = {city.get('slug'): city for city in cities}
+    moscow = cities_by_slug.get('msk')
+    if moscow is None:
+        moscow = next((city for city in cities if 'москв' in city.get('name', '').lower()), None)
+    
     city_id = None
     city_slug = None
-    for city in cities[:10]:  # Показываем первые 10 для отладки
-        logger.debug(f"Город: {city}")
-        city_name = city.get('name', '').lower()
-        if 'москв' in city_name or city.get('slug') == 'msk':
-            city_id = city.get('id')
-            city_slug = city.get('slug', 'msk')
-            logger.info(f"Найден город: {city.get('name')} (ID: {city_id}, slug: {city_slug})")
-            break
+    if moscow is not None:
+        city_id = moscow.get('id')
+        city_slug = moscow.get('slug', 'msk')
+        logger.info(f"Найден город: {moscow.get('name')} (ID: {city_id}, slug: {city_slug})")
     
     if not city_id:
         logger.error("Город Москва не найден в API")
@@ -61,16 +132,144 @@ def fetch_moscow_shows(output_file: str = None):
         city_slug = 'msk'
         logger.info(f"Используем slug города: {city_slug}")
     
+    # Используем slug города (msk для Москвы)
+    return city_id, city_slug or "msk"
+
+
+@functools.cache
+def _theater_slug() -> str:
+    """Возвращает slug категории "Спектакли" в KudaGo."""
     # Используем категорию "театр" (ID=2, slug="theater")
     # API принимает slug категории, а не ID
     theater_category_slug = "theater"
     logger.info(f"Используем категорию 'Спектакли' (slug: {theater_category_slug}, ID: 2)")
+    return theater_category_slug
+
+
+def _open_csv(path: Path, compress: bool) -> TextIO:
+    """Открывает CSV файл на запись: обычный (с большим буфером) или сжатый gzip."""
+    if compress:
+        return gzip.open(path, 'wt', encoding='utf-8', newline='', compresslevel=CSV_GZIP_LEVEL)
+    return open(path, 'w', newline='', encoding='utf-8', buffering=CSV_WRITE_BUFFER_SIZE)
+
+
+def _fsync_file(path: Path) -> None:
+    """Сбрасывает содержимое закрытого файла на диск (os.fsync)."""
+    with open(path, 'rb+') as f:
+        os.fsync(f.fileno())
+
+
+def _q(value) -> str:
+    """Возвращает значение поля CSV, экранированное так же, как это делает csv.writer."""
+    if value is None:
+        return ''
+    value = str(value)
+    if _CSV_SPECIAL_RE.search(value):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _csv_line(show: Dict) -> str:
+    """Формирует строку CSV для спектакля (фиксированный набор колонок CSV_FIELDNAMES)."""
+    return (
+        f"{_q(show['id'])},{_q(show['short_title'])},{_q(show['place'])},"
+        f"{_q(show['dates'])},{_q(show['location'])}{CSV_LINE_END}"
+    )
+
+
+async def write_shows_async(api: KudaGoAPI, csvfile: TextIO, **query) -> Tuple[int, int]:
+    """
+    Загружает события постранично и сразу записывает разобранные спектакли в CSV.
+    
+    Строки собираются напрямую (без csv.DictWriter): набор колонок фиксирован.
+    
+    В памяти держатся только события текущей страницы (и уже запрошенных следующих),
+    а не весь каталог целиком.
+    
+    Args:
+        api: Клиент KudaGo API
+        csvfile: Открытый CSV файл с уже записанным заголовком
+        **query: Параметры KudaGoAPI.iter_event_pages_async
+    
+    Returns:
+        Кортеж (загружено событий, записано спектаклей)
+    """
+    current_date = datetime.now(timezone.utc).date()
+    # Событие, встретившееся несколько раз (на соседних страницах выдачи), записывается один раз
+    seen_ids = set()
+    events_count = 0
+    shows_count = 0
+    batch = []
+    try:
+        # Страница - естественная порция событий: проверки и лог прогресса
+        # выполняются один раз на страницу, а не на каждое событие
+        async for page in api.iter_event_pages_async(**query):
+            # Отладочный вывод для первого события (сериализация - только при уровне DEBUG)
+            if not events_count and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Структура первого события: %s", orjson.dumps(page[0], option=orjson.OPT_INDENT_2).decode()[:1000])
+            
+            new_events = []
+            for event in page:
+                event_id = event.get('id')
+                if event_id not in seen_ids:
+                    seen_ids.add(event_id)
+                    new_events.append(event)
+            
+            # Места страницы, не развернутые в событиях, запрашиваются параллельно
+            for show_info in await api.extract_show_info_batch_async(new_events, current_date):
+                batch.append(_csv_line(show_info))
+            if len(batch) >= CSV_WRITE_BATCH:
+                csvfile.write(''.join(batch))
+                shows_count += len(batch)
+                batch.clear()
+            
+            events_count += len(page)
+            logger.info("Обработано событий: %d", events_count)
+        
+        if batch:
+            csvfile.write(''.join(batch))
+            shows_count += len(batch)
+    finally:
+        # Асинхронный клиент привязан к циклу событий asyncio.run, закрываем его здесь
+        await api.aclose()
+    
+    return events_count, shows_count
+
+
+def fetch_moscow_shows(output_file: str = None, compress: bool = False):
+    """
+    Выгружает данные о спектаклях из Москвы и сохраняет в CSV.
+    
+    Args:
+        output_file: Путь к выходному CSV файлу (по умолчанию data/shows_catalog.csv)
+        compress: Сохранить сжатым gzip в файл с суффиксом .gz (бот читает только
+            несжатый каталог, поэтому по умолчанию выключено)
+    """
+    # Определяем путь к файлу
+    if output_file is None:
+        output_file = project_root / "data" / "shows_catalog.csv"
+    
+    output_path = Path(output_file)
+    if compress:
+        output_path = output_path.with_suffix(output_path.suffix + '.gz')
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    # Каталог меняется несколько раз в день: свежий файл не перевыгружаем
+    try:
+        if time.time() - output_path.stat().st_mtime < SHOWS_TTL:
+            logger.info(f"Используется выгруженный ранее каталог {output_path} (моложе {SHOWS_TTL} с)")
+            return
+    except FileNotFoundError:
+        pass
+    
+    # API клиент общий для всех вызовов (ключ кэша _resolve_moscow)
+    api = _get_api()
+    
+    _, location_slug = _resolve_moscow(api)
+    theater_category_slug = _theater_slug()
     
     # Получаем все события (спектакли) - только предстоящие
     logger.info("Загрузка спектаклей из API...")
-    
-    # Используем slug города (msk для Москвы)
-    location_slug = city_slug if city_slug else "msk"
     logger.info(f"Используем location: {location_slug}")
     
     # Используем slug категории (theater для категории "Спектакли" с ID=2)
@@ -78,55 +277,53 @@ def fetch_moscow_shows(output_file: str = None):
     
     # Получаем текущую дату в формате Unix timestamp
     current_timestamp = int(datetime.now(timezone.utc).timestamp())
-    logger.info(f"Фильтруем события с даты: {datetime.fromtimestamp(current_timestamp).strftime('%Y-%m-%d %H:%M:%S')}")
-    
-    # Запрашиваем поля: id, short_title, place, dates, location
-    # expand=place,dates,location - для получения детальной информации
-    # actual_since - только предстоящие события с текущей даты
-    events = api.get_all_events(
-        location=location_slug,
-        categories=theater_category_slug,
-        fields="id,short_title,place,dates,location",
-        expand="place,dates,location",  # Получаем детальную информацию
-        max_pages=None,  # Загружаем все страницы
-        actual_since=current_timestamp  # Только предстоящие события
-    )
+    logger.info("Фильтруем события с даты (Unix timestamp): %d", current_timestamp)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Фильтруем события с даты: %s", datetime.fromtimestamp(current_timestamp).strftime('%Y-%m-%d %H:%M:%S'))
     
-    logger.info(f"Загружено {len(events)} событий")
-    
-    # Извлекаем информацию о спектаклях
-    shows = []
-    processed = 0
-    debug_printed = False
-    for event in events:
-        # Отладочный вывод для первого события
-        if not debug_printed and processed == 0:
-            import json
-            logger.debug(f"Структура первого события: {json.dumps(event, ensure_ascii=False, indent=2)[:1000]}")
-            debug_printed = True
-        
-        show_info = api.extract_show_info(event)
-        if show_info:
-            shows.append(show_info)
-        processed += 1
-        if processed % 50 == 0:
-            logger.info(f"Обработано {processed}/{len(events)} событий...")
-    
-    logger.info(f"Обработано {len(shows)} спектаклей")
-    
-    # Сохраняем в CSV
-    if shows:
-        with open(output_path, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['id', 'short_title', 'place', 'dates', 'location']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+    # Спектакли пишутся во временный файл по мере загрузки страниц; каталог
+    # заменяется только если что-то записано, иначе старый файл остается как есть.
+    # Если страница не загрузилась и после повторов, iter_event_pages_async выбрасывает
+    # исключение и каталог с пропусками не подменяет полный
+    tmp_path = output_path.with_suffix(output_path.suffix + '.tmp')
+    try:
+        with _open_csv(tmp_path, compress) as csvfile:
+            csvfile.write(CSV_HEADER)
             
-            writer.writeheader()
-            for show in shows:
-                writer.writerow(show)
+            # Запрашиваем поля: id, short_title, place, dates, location
+            # expand=place,dates - название места и даты в московском времени (start_date/start_time);
+            # location не разворачиваем: без expand API отдает {"slug": ...}, этого достаточно
+            # actual_since - только предстоящие события с текущей даты
+            # Страницы загружаются параллельно асинхронным клиентом (HTTP/2, не более MAX_CONCURRENT_REQUESTS запросов)
+            events_count, shows_count = asyncio.run(write_shows_async(
+                api,
+                csvfile,
+                location=location_slug,
+                categories=theater_category_slug,
+                fields="id,short_title,place,dates,location",
+                expand="place,dates",
+                max_pages=None,  # Загружаем все страницы
+                actual_since=current_timestamp  # Только предстоящие события
+            ))
         
+        # Данные должны оказаться на диске до переименования: иначе после сбоя
+        # на месте каталога может остаться пустой или недописанный файл
+        if shows_count:
+            _fsync_file(tmp_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    
+    logger.info(f"Загружено {events_count} событий")
+    logger.info(f"Обработано {shows_count} спектаклей")
+    
+    if shows_count:
+        # os.replace атомарно подменяет каталог: читатели видят либо старый файл, либо новый
+        os.replace(tmp_path, output_path)
         logger.info(f"Данные сохранены в {output_path}")
-        logger.info(f"Всего записей: {len(shows)}")
+        logger.info(f"Всего записей: {shows_count}")
     else:
+        tmp_path.unlink()
         logger.warning("Нет данных для сохранения")
 
 